@@ -1,22 +1,77 @@
 import sys
-import pandas as pd
 import os
+import shutil
+import time
 import cv2
 from PyQt5.QtWidgets import (
-    QApplication, QWidget, QVBoxLayout, QPushButton, QLabel, QMessageBox, QTableWidget, QTableWidgetItem, QInputDialog, QFormLayout, QLineEdit
+    QApplication, QWidget, QVBoxLayout, QPushButton, QLabel, QMessageBox, QTableView, QInputDialog, QFormLayout, QLineEdit,
+    QFileDialog, QProgressDialog
 )
 from PyQt5.QtGui import QFont
+from PyQt5.QtCore import QThread, Qt, pyqtSignal
+from attendance_model import AttendanceTableModel
+import config
+from attendance_store import open_store
+from bulk_enroll import bulk_enroll
+from encoding_store import valid_identity
+from reporting import ReportEngine, write_report
 
 # Define paths
-ATTENDANCE_FILE = os.path.join("attendance_logs", "attendance.csv")
 DATASET_DIR = "dataset"
 
 # Ensure dataset directory exists
 os.makedirs(DATASET_DIR, exist_ok=True)
 
+class BulkImportThread(QThread):
+    """Runs bulk_enroll() off the GUI thread and reports progress through signals."""
+
+    progress = pyqtSignal(int, int)
+    done = pyqtSignal(list, list)
+    failed = pyqtSignal(str)
+
+    def __init__(self, roster_path, source, parent=None):
+        super().__init__(parent)
+        self.roster_path = roster_path
+        self.source = source
+
+    def run(self):
+        try:
+            enrolled, rejected = bulk_enroll(self.roster_path, self.source, progress=self.progress.emit)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.done.emit(enrolled, rejected)
+
+class DefaultersExportThread(QThread):
+    """Refreshes the panel's report engine and writes the defaulters report off the GUI thread."""
+
+    done = pyqtSignal(int, str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, engine, path, parent=None):
+        super().__init__(parent)
+        self.engine = engine
+        self.path = path
+
+    def run(self):
+        try:
+            report = self.engine.refresh().defaulters()
+            write_report(report, self.path)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.done.emit(len(report), self.path)
+
 class AdminPage(QWidget):
+    closed = pyqtSignal()
+
     def __init__(self):
         super().__init__()
+        self.store = open_store()
+        # Kept for the panel's lifetime, so each export only reads the new check-ins
+        self.report_engine = ReportEngine(self.store)
+        self.bulk_thread = None
+        self.defaulters_thread = None
         self.initUI()
 
     def initUI(self):
@@ -29,8 +84,20 @@ class AdminPage(QWidget):
         self.label.setFont(QFont("Arial", 14))
         layout.addWidget(self.label)
 
-        self.table = QTableWidget(self)
-        self.load_attendance_data()
+        self.search_input = QLineEdit(self)
+        self.search_input.setPlaceholderText("Search by name, roll no or branch")
+        self.search_input.textChanged.connect(self.search_attendance_data)
+        layout.addWidget(self.search_input)
+
+        # The model pages rows out of the store as the view scrolls
+        self.model = AttendanceTableModel(self.store, parent=self)
+        self.table = QTableView(self)
+        self.table.setModel(self.model)
+        self.table.setSortingEnabled(True)
+        # Enabling sorting applies Qt's default indicator (descending); open sorted by Name, A to Z
+        self.table.sortByColumn(0, Qt.AscendingOrder)
+        self.table.setSelectionBehavior(QTableView.SelectRows)
+        self.table.setSelectionMode(QTableView.SingleSelection)
         layout.addWidget(self.table)
 
         self.refresh_button = QPushButton("Refresh", self)
@@ -45,6 +112,18 @@ class AdminPage(QWidget):
         self.register_button.clicked.connect(self.register_face)
         layout.addWidget(self.register_button)
 
+        self.bulk_button = QPushButton("Bulk Import", self)
+        self.bulk_button.setFont(QFont("Arial", 12))
+        self.bulk_button.setStyleSheet("background-color: #2196F3; color: white; padding: 10px; border-radius: 5px;")
+        self.bulk_button.clicked.connect(self.bulk_import)
+        layout.addWidget(self.bulk_button)
+
+        self.defaulters_button = QPushButton("Export Defaulters", self)
+        self.defaulters_button.setFont(QFont("Arial", 12))
+        self.defaulters_button.setStyleSheet("background-color: #2196F3; color: white; padding: 10px; border-radius: 5px;")
+        self.defaulters_button.clicked.connect(self.export_defaulters)
+        layout.addWidget(self.defaulters_button)
+
         self.delete_button = QPushButton("Delete Selected", self)
         self.delete_button.setFont(QFont("Arial", 12))
         self.delete_button.setStyleSheet("background-color: #d9534f; color: white; padding: 10px; border-radius: 5px;")
@@ -60,28 +139,15 @@ class AdminPage(QWidget):
         self.setLayout(layout)
 
     def load_attendance_data(self):
-        """Load and display attendance data from the CSV file."""
-        if not os.path.exists(ATTENDANCE_FILE):
-            QMessageBox.warning(self, "Error", "Attendance file not found!")
-            return
+        """Reload the attendance table from the attendance store."""
+        self.model.refresh()
 
-        df = pd.read_csv(ATTENDANCE_FILE)
-
-        # Calculate attendance percentage for each person
-        df["Attendance Percentage"] = (df["Days Present"] / (df["Days Present"] + df["Days Absent"])) * 100
-        df["Attendance Percentage"] = df["Attendance Percentage"].round(2)  # Round to 2 decimal places
-
-        # Update the table
-        self.table.setRowCount(df.shape[0])
-        self.table.setColumnCount(df.shape[1])
-        self.table.setHorizontalHeaderLabels(df.columns)
-
-        for row in range(df.shape[0]):
-            for col in range(df.shape[1]):
-                self.table.setItem(row, col, QTableWidgetItem(str(df.iat[row, col])))
+    def search_attendance_data(self, text):
+        """Filter the attendance table by the search box text."""
+        self.model.set_search(text)
 
     def register_face(self):
-        """Register a new face by capturing an image and saving it to the dataset."""
+        """Register a new face by capturing several images and saving them to the dataset."""
         # Create a form to collect details
         form = QWidget()
         form.setWindowTitle("Registration Form")
@@ -114,6 +180,8 @@ class AdminPage(QWidget):
         if not name or not roll_no or not branch or not mobile_no:
             QMessageBox.warning(self, "Error", "All fields are required!")
             return
+        if not self.check_new_name(name):
+            return
 
         # Open the camera to capture an image
         cap = cv2.VideoCapture(0)
@@ -121,7 +189,10 @@ class AdminPage(QWidget):
             QMessageBox.critical(self, "Error", "Failed to open the camera! Please check if the camera is connected and accessible.")
             return
 
-        # Keep the camera open until the user presses a key
+        # Keep the camera open until the user presses a key, then take
+        # ENROLL_SAMPLES frames a little apart while the person moves their head
+        samples = []
+        next_sample = None
         while True:
             ret, frame = cap.read()
             if not ret:
@@ -129,27 +200,27 @@ class AdminPage(QWidget):
                 cap.release()
                 return
 
+            if next_sample is not None and time.monotonic() >= next_sample:
+                samples.append(frame.copy())
+                next_sample = time.monotonic() + config.ENROLL_SAMPLE_INTERVAL
+                if len(samples) == config.ENROLL_SAMPLES:
+                    self.save_samples(name, roll_no, branch, mobile_no, samples)
+                    break
+
             # Display the live camera feed
-            cv2.imshow("Press 'Enter' to Capture, 'Esc' to Cancel", frame)
+            preview = frame
+            if next_sample is not None:
+                preview = frame.copy()
+                cv2.putText(preview, f"Capturing {len(samples) + 1}/{config.ENROLL_SAMPLES}: turn your head slightly",
+                            (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+            cv2.imshow("Press 'Enter' to Capture, 'Esc' to Cancel", preview)
 
             # Wait for a key press
             key = cv2.waitKey(1) & 0xFF
 
-            # If 'Enter' is pressed, capture the image
-            if key == 13:  # 13 is the ASCII code for Enter
-                # Save the captured image to the dataset directory
-                image_path = os.path.join(DATASET_DIR, f"{name}.jpg")
-                try:
-                    success = cv2.imwrite(image_path, frame)
-                    if success:
-                        # Save the details to the attendance file
-                        self.save_details(name, roll_no, branch, mobile_no)
-                        QMessageBox.information(self, "Success", f"Face registered for: {name}")
-                    else:
-                        QMessageBox.critical(self, "Error", "Failed to save the image! Check if the dataset directory is accessible.")
-                except Exception as e:
-                    QMessageBox.critical(self, "Error", f"Failed to save the image: {str(e)}")
-                break
+            # If 'Enter' is pressed, start taking the samples
+            if key == 13 and next_sample is None:  # 13 is the ASCII code for Enter
+                next_sample = time.monotonic()
 
             # If 'Esc' is pressed, cancel the operation
             elif key == 27:  # 27 is the ASCII code for Esc
@@ -161,41 +232,125 @@ class AdminPage(QWidget):
         cv2.destroyAllWindows()
         form.close()
 
+    def check_new_name(self, name):
+        """Warn and return False if name cannot be a dataset folder or is already registered."""
+        if not valid_identity(name):
+            QMessageBox.warning(self, "Error", f"{name!r} cannot be used as a name: it must not be "
+                                               f"'.' or '..' or contain {os.sep!r}.")
+            return False
+        if self.store.counters(name) is not None:
+            QMessageBox.warning(self, "Error", f"{name} is already registered!")
+            return False
+        return True
+
+    def save_samples(self, name, roll_no, branch, mobile_no, frames):
+        """Replace the person's samples in dataset/<name>/ and save their details."""
+        # Checked again here, before anything on disk is touched
+        if not self.check_new_name(name):
+            return
+        person_dir = os.path.join(DATASET_DIR, name)
+        try:
+            if os.path.isdir(person_dir):
+                shutil.rmtree(person_dir)
+            os.makedirs(person_dir)
+            for i, frame in enumerate(frames):
+                if not cv2.imwrite(os.path.join(person_dir, f"{i:02d}.jpg"), frame):
+                    QMessageBox.critical(self, "Error", "Failed to save the image! Check if the dataset directory is accessible.")
+                    return
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to save the image: {str(e)}")
+            return
+        # Save the details to the attendance file
+        self.save_details(name, roll_no, branch, mobile_no)
+        QMessageBox.information(self, "Success", f"Face registered for: {name} ({len(frames)} samples)")
+
     def save_details(self, name, roll_no, branch, mobile_no):
-        """Save the registration details to the attendance file."""
-        if not os.path.exists(ATTENDANCE_FILE):
-            df = pd.DataFrame(columns=["Name", "Roll No", "Branch", "Mobile No", "Days Present", "Days Absent", "Absent Dates","Attendance Percentage"])
+        """Save the registration details to the attendance store."""
+        if not self.store.register(name, roll_no, branch, mobile_no):
+            QMessageBox.warning(self, "Error", f"{name} is already registered!")
+
+    def bulk_import(self):
+        """Enroll a whole class from a roster CSV and a folder or ZIP of photos."""
+        roster_path, _ = QFileDialog.getOpenFileName(self, "Select Roster", "", "CSV files (*.csv)")
+        if not roster_path:
+            return
+
+        kind, ok = QInputDialog.getItem(self, "Bulk Import", "Photos are in a:", ["Folder", "ZIP file"], 0, False)
+        if not ok:
+            return
+        if kind == "Folder":
+            source = QFileDialog.getExistingDirectory(self, "Select Photo Folder")
         else:
-            df = pd.read_csv(ATTENDANCE_FILE)
+            source, _ = QFileDialog.getOpenFileName(self, "Select Photo Archive", "", "ZIP archives (*.zip)")
+        if not source:
+            return
 
-        # Check if the name already exists
-        if name in df["Name"].values:
-            QMessageBox.warning(self, "Error", f"{name} is already registered!")
+        self.bulk_progress = QProgressDialog("Encoding photos...", None, 0, 0, self)
+        self.bulk_progress.setWindowTitle("Bulk Import")
+        self.bulk_progress.setMinimumDuration(0)
+        self.bulk_progress.show()
+        self.bulk_button.setEnabled(False)
+
+        self.bulk_thread = BulkImportThread(roster_path, source, self)
+        self.bulk_thread.progress.connect(self.on_bulk_progress)
+        self.bulk_thread.done.connect(self.on_bulk_done)
+        self.bulk_thread.failed.connect(self.on_bulk_failed)
+        self.bulk_thread.start()
+
+    def on_bulk_progress(self, done, total):
+        self.bulk_progress.setMaximum(total)
+        self.bulk_progress.setValue(done)
+
+    def on_bulk_done(self, enrolled, rejected):
+        self.bulk_progress.close()
+        self.bulk_button.setEnabled(True)
+        self.load_attendance_data()
+        message = f"Enrolled {len(enrolled)} people, rejected {len(rejected)}."
+        if rejected:
+            message += "\n\n" + "\n".join(f"{name}: {reason}" for name, _, reason in rejected[:20])
+            if len(rejected) > 20:
+                message += f"\n... and {len(rejected) - 20} more"
+        QMessageBox.information(self, "Bulk Import", message)
+
+    def on_bulk_failed(self, error):
+        self.bulk_progress.close()
+        self.bulk_button.setEnabled(True)
+        QMessageBox.critical(self, "Bulk Import", f"Import failed: {error}")
+
+    def export_defaulters(self):
+        """Save everybody below the defaulter threshold, lowest attendance first."""
+        path, _ = QFileDialog.getSaveFileName(self, "Export Defaulters", "defaulters.csv",
+                                              "CSV files (*.csv);;Parquet files (*.parquet)")
+        if not path:
             return
+        self.defaulters_button.setEnabled(False)
+        self.defaulters_thread = DefaultersExportThread(self.report_engine, path, self)
+        self.defaulters_thread.done.connect(self.on_defaulters_done)
+        self.defaulters_thread.failed.connect(self.on_defaulters_failed)
+        self.defaulters_thread.start()
 
-        # Add the new entry
-        df = pd.concat([df, pd.DataFrame([[
-            name, roll_no, branch, mobile_no, 0, 0, "",0
-        ]], columns=df.columns)], ignore_index=True)
+    def on_defaulters_done(self, count, path):
+        self.defaulters_button.setEnabled(True)
+        QMessageBox.information(self, "Export Defaulters",
+                                f"{count} people below {config.DEFAULTER_THRESHOLD:g}% written to {path}")
 
-        # Save the updated dataframe
-        df.to_csv(ATTENDANCE_FILE, index=False)
+    def on_defaulters_failed(self, error):
+        self.defaulters_button.setEnabled(True)
+        QMessageBox.critical(self, "Error", f"Failed to export defaulters: {error}")
 
     def delete_selected(self):
         """Delete the selected person's data from the attendance file and their image from the dataset."""
-        selected_row = self.table.currentRow()
+        selected_row = self.table.currentIndex().row()
         if selected_row == -1:
             QMessageBox.warning(self, "Error", "No row selected! Please select a row to delete.")
             return
 
         # Get the name of the selected person
-        name_item = self.table.item(selected_row, 0)  # Assuming the name is in the first column
-        if not name_item:
+        name = self.model.name_at(selected_row)
+        if not name:
             QMessageBox.warning(self, "Error", "No name found in the selected row!")
             return
 
-        name = name_item.text()
-
         # Confirm deletion
         confirm = QMessageBox.question(
             self,
@@ -206,28 +361,40 @@ class AdminPage(QWidget):
         if confirm == QMessageBox.No:
             return
 
-        # Delete the person's image from the dataset
+        # Delete the person's image or sample folder from the dataset; a name
+        # that is not a plain file name never had one, and must not reach rmtree
         image_path = os.path.join(DATASET_DIR, f"{name}.jpg")
-        if os.path.exists(image_path):
+        person_dir = os.path.join(DATASET_DIR, name)
+        if valid_identity(name) and (os.path.exists(image_path) or os.path.isdir(person_dir)):
             try:
-                os.remove(image_path)
+                if os.path.exists(image_path):
+                    os.remove(image_path)
+                if os.path.isdir(person_dir):
+                    shutil.rmtree(person_dir)
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to delete image: {str(e)}")
                 return
 
-        # Delete the person's data from the attendance file
-        if not os.path.exists(ATTENDANCE_FILE):
-            QMessageBox.warning(self, "Error", "Attendance file not found!")
-            return
-
-        df = pd.read_csv(ATTENDANCE_FILE)
-        df = df[df["Name"] != name]  # Remove the row with the selected name
-        df.to_csv(ATTENDANCE_FILE, index=False)
+        # Delete the person's data from the attendance store
+        self.store.delete(name)
 
         # Refresh the table
         self.load_attendance_data()
         QMessageBox.information(self, "Success", f"Data for {name} has been deleted.")
 
+    def closeEvent(self, event):
+        # An import can take minutes; keep the panel (and its thread) alive until it is done
+        if self.bulk_thread is not None and self.bulk_thread.isRunning():
+            QMessageBox.information(self, "Bulk Import", "Please wait for the bulk import to finish before closing.")
+            event.ignore()
+            return
+        # Let a running export finish with the store before closing it
+        if self.defaulters_thread is not None:
+            self.defaulters_thread.wait()
+        self.store.close()
+        event.accept()
+        self.closed.emit()
+
 if __name__ == '__main__':
     app = QApplication(sys.argv)
     window = AdminPage()
@@ -1,95 +1,169 @@
+import math
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import cv2
-import face_recognition
-import numpy as np
 import os
-import pandas as pd
-from datetime import datetime
-from PyQt5.QtWidgets import QApplication, QLabel, QPushButton, QVBoxLayout, QWidget, QMessageBox, QInputDialog, QHBoxLayout
-from PyQt5.QtGui import QImage, QPixmap, QIcon, QFont
-from PyQt5.QtCore import QTimer, Qt
+from PyQt5.QtWidgets import QApplication, QLabel, QPushButton, QVBoxLayout, QWidget, QMessageBox, QInputDialog, QHBoxLayout, QGridLayout, QComboBox
+from PyQt5.QtGui import QIcon, QFont
+from PyQt5.QtCore import QTimer, Qt, pyqtSignal
 from PyQt5.QtWidgets import QLineEdit
+import config
+import metrics
+from attendance_cache import AttendanceCache
+from attendance_store import open_store
+from admin_page import AdminPage
+from camera import CameraGrabber, parse_cameras
+from encoding_store import EncodingStore
+from face_index import build_index
+from face_tracker import FaceTracker
+from gallery_watcher import GalleryWatcher
+from frame_pipeline import FrameRenderer, PreviewLabel
+from recognition_worker import RecognitionPipeline
+from service_client import ServiceClient, ServiceError
 
 # Define directories
 DATASET_DIR = 'dataset'
 CAPTURED_IMAGES_DIR = 'captured_images'
 ATTENDANCE_DIR = 'attendance_logs'
-ATTENDANCE_FILE = os.path.join(ATTENDANCE_DIR, 'attendance.csv')
+ENCODINGS_DIR = 'encodings'
+
+# How long face boxes from a recognition result stay on the preview
+OVERLAY_SECONDS = 2.0
+
+# Stages shown on the optional performance overlay, in pipeline order
+OVERLAY_STAGES = ('render', 'queue_wait', 'gate', 'convert', 'detect', 'encode', 'match', 'log_attendance')
 
 # Ensure necessary directories exist
 os.makedirs(DATASET_DIR, exist_ok=True)
 os.makedirs(CAPTURED_IMAGES_DIR, exist_ok=True)
 os.makedirs(ATTENDANCE_DIR, exist_ok=True)
+os.makedirs(ENCODINGS_DIR, exist_ok=True)
 
 # Load known faces
 def load_known_faces():
-    known_face_encodings = []
-    known_face_names = []
-
-    for image_file in os.listdir(DATASET_DIR):
-        image_path = os.path.join(DATASET_DIR, image_file)
-        image = face_recognition.load_image_file(image_path)
-
-        encodings = face_recognition.face_encodings(image)
-        if encodings:
-            known_face_encodings.append(encodings[0])
-            known_face_names.append(os.path.splitext(image_file)[0])
-
-    return known_face_encodings, known_face_names
+    """Return (encodings, names), re-encoding only images that changed since the last run."""
+    store = EncodingStore(DATASET_DIR, ENCODINGS_DIR)
+    return store.sync()
+
+# Attendance cache over the configured store, opened on first use
+_attendance = None
+
+def get_attendance():
+    """Return the process-wide attendance cache, or the service client when a service is configured."""
+    global _attendance
+    if _attendance is None:
+        if config.SERVICE_URL:
+            _attendance = ServiceClient(config.SERVICE_URL)
+        else:
+            _attendance = AttendanceCache(open_store())
+    return _attendance
 
 # Log attendance
-def log_attendance(name):
-    today = datetime.now().strftime('%Y-%m-%d')
-
-    # Check if the attendance file exists
-    if not os.path.exists(ATTENDANCE_FILE):
-        # Create a new DataFrame with the required columns
-        df = pd.DataFrame(columns=["Name", "Roll No", "Branch", "Mobile No", "Date", "Days Present", "Days Absent", "Absent Dates"])
-    else:
-        # Load the existing CSV file
-        df = pd.read_csv(ATTENDANCE_FILE)
-
-    # Check if the name already exists in the DataFrame
-    if name in df["Name"].values:
-        user_row = df[df["Name"] == name]
-        if today in user_row["Date"].values:
-            QMessageBox.information(None, "Attendance", "Attendance for today is already marked.")
-            return
-
-        # Update the existing user's attendance
-        df.loc[df["Name"] == name, "Days Present"] += 1
-        df.loc[df["Name"] == name, "Date"] = today
+def log_attendance(name, camera=""):
+    """Mark today's attendance for name; returns False if it was already marked."""
+    return log_attendance_many([name], camera=camera)[name]
+
+@metrics.timed('log_attendance')
+def log_attendance_many(names, camera=""):
+    """Mark today's attendance for several people seen by camera.
+
+    Returns a dict mapping each name to True if it was newly marked, False if it
+    was already marked today. Answered from memory; the write to the store
+    happens in the background.
+    """
+    return get_attendance().mark_present(names, camera=camera)
+
+def check_in_many(names, camera=""):
+    """Mark several people present; returns ({name: attendance percentage} for those newly marked, today's total).
+
+    Against a recognition service this is two round trips, so the kiosk runs
+    it off the GUI thread.
+    """
+    attendance = get_attendance()
+    if config.SERVICE_URL:
+        checked_in = attendance.check_in(names, camera=camera)
+        marked = {name: result['percentage'] for name, result in checked_in.items() if result['marked']}
     else:
-        # Add a new entry for the user
-        new_entry = {
-            "Name": name,
-            "Roll No": "",  # Default value for Roll No
-            "Branch": "",   # Default value for Branch
-            "Mobile No": "",  # Default value for Mobile No
-            "Date": today,
-            "Days Present": 1,
-            "Days Absent": 0,
-            "Absent Dates": ""
-        }
-        df = pd.concat([df, pd.DataFrame([new_entry])], ignore_index=True)
-
-    # Save the updated DataFrame to the CSV file
-    df.to_csv(ATTENDANCE_FILE, index=False)
+        marked = {name: attendance.percentage(name)
+                  for name, new in log_attendance_many(names, camera=camera).items() if new}
+    return marked, attendance.total_present() if marked else None
 
 class FaceRecognitionApp(QWidget):
+    gallery_updated = pyqtSignal(object, list, list)
+    attendance_done = pyqtSignal(object, object, object, object)  # on_done, result, error, camera
+
     def __init__(self):
         super().__init__()
+        self.camera_sources = parse_cameras(config.CAMERAS)
+        # Attendance calls to a recognition service are HTTP round trips: one
+        # thread runs them in order and hands the results back to the GUI thread
+        self.attendance_executor = None
+        if config.SERVICE_URL:
+            self.attendance_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='attendance')
+        self.attendance_done.connect(self.on_attendance_done)
         self.initUI()
-        self.known_face_encodings, self.known_face_names = load_known_faces()
-        self.video_capture = cv2.VideoCapture(0)
-        
-        if not self.video_capture.isOpened():
+        self.admin_page = None
+        self.stats_lines = []  # performance overlay text, refreshed by update_rates
+        self.metrics_dumper = metrics.start_dumper()
+        if config.SERVICE_URL:
+            # The service holds the encodings; this process only streams frames to it
+            self.service = ServiceClient(config.SERVICE_URL)
+            self.face_index = None
+        else:
+            self.service = None
+            self.known_face_encodings, self.known_face_names = load_known_faces()
+            self.face_index = build_index(self.known_face_encodings, self.known_face_names)
+        self.gallery_watcher = None
+        if self.service is None and config.GALLERY_WATCH:
+            # Enrollments and deletions reach the running kiosk without a restart;
+            # the watcher thread hands new indexes over through a queued signal
+            self.gallery_updated.connect(self.on_gallery_updated)
+            self.gallery_watcher = GalleryWatcher(EncodingStore(DATASET_DIR, ENCODINGS_DIR), self.face_index,
+                                                  self.gallery_updated.emit).start()
+        self.recognition = RecognitionPipeline(self.face_index, service=self.service, parent=self)
+        self.recognition.result_ready.connect(self.on_recognition_result)
+
+        # Hands-free mode state
+        self.recognized_count = 0
+        self.rate_started = time.monotonic()
+        self.last_seen = {}  # name -> time the identity was last processed, on any camera
+
+        # Per-camera state, keyed by camera ID
+        self.cameras = {}
+        self.frame_count = {}
+        self.rate_frames = {}
+        self.last_frame_seq = {}
+        self.overlay = {}  # camera -> (time, face locations, names) of its latest result
+        self.trackers = {}  # camera -> FaceTracker for hands-free mode
+        for camera_id, source in self.camera_sources:
+            grabber = CameraGrabber(source, name=camera_id)
+            if not grabber.start():
+                # One dead entrance should not take the others down with it
+                QMessageBox.warning(self, "Camera Error", f"Failed to open camera {camera_id}!")
+                self.video_labels[camera_id].setText(f"{camera_id}: camera unavailable")
+                continue
+            self.cameras[camera_id] = grabber
+            self.frame_count[camera_id] = 0
+            self.rate_frames[camera_id] = 0
+            self.last_frame_seq[camera_id] = 0
+            self.overlay[camera_id] = (0.0, [], [])
+            if config.TRACKING:
+                self.trackers[camera_id] = FaceTracker()
+
+        if not self.cameras:
             QMessageBox.critical(self, "Camera Error", "Failed to open the camera!")
             sys.exit(1)
         
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.update_frame)
         self.timer.start(30)
+
+        # Refresh the frame rate / recognition rate readout once a second
+        self.rate_timer = QTimer(self)
+        self.rate_timer.timeout.connect(self.update_rates)
+        self.rate_timer.start(1000)
     
     def initUI(self):
         self.setWindowTitle('Face Recognition Attendance')
@@ -102,9 +176,18 @@ class FaceRecognitionApp(QWidget):
         # Left panel (video and buttons)
         left_panel = QVBoxLayout()
 
-        self.video_label = QLabel(self)
-        self.video_label.setAlignment(Qt.AlignCenter)
-        left_panel.addWidget(self.video_label)
+        # One preview per camera, laid out in a roughly square grid
+        self.video_labels = {}
+        self.renderers = {}
+        preview_grid = QGridLayout()
+        columns = math.ceil(math.sqrt(len(self.camera_sources)))
+        for position, (camera_id, _) in enumerate(self.camera_sources):
+            video_label = PreviewLabel(self)
+            video_label.setAlignment(Qt.AlignCenter)
+            preview_grid.addWidget(video_label, position // columns, position % columns)
+            self.video_labels[camera_id] = video_label
+            self.renderers[camera_id] = FrameRenderer()
+        left_panel.addLayout(preview_grid)
 
         self.status_label = QLabel('Status: Waiting...', self)
         self.status_label.setFont(QFont("Arial", 12))
@@ -132,6 +215,36 @@ class FaceRecognitionApp(QWidget):
         self.capture_button.setFixedSize(150, 40)  # Set fixed size
         left_panel.addWidget(self.capture_button)
 
+        # Which camera the Capture Face button uses; only shown with several cameras
+        self.camera_select = QComboBox(self)
+        self.camera_select.addItems([camera_id for camera_id, _ in self.camera_sources])
+        self.camera_select.setFixedWidth(150)
+        self.camera_select.setVisible(len(self.camera_sources) > 1)
+        left_panel.addWidget(self.camera_select)
+
+        # Auto Mode Button
+        self.auto_button = QPushButton('Auto Mode', self)
+        self.auto_button.setFont(QFont("Arial", 10))  # Smaller font size
+        self.auto_button.setCheckable(True)
+        self.auto_button.setChecked(config.AUTO_MODE)
+        self.auto_button.setStyleSheet(
+            """
+            QPushButton {
+                background-color: #607D8B;
+                color: white;
+                padding: 8px 16px;
+                border-radius: 5px;
+                border: 1px solid #546E7A;
+            }
+            QPushButton:checked {
+                background-color: #2196F3;
+                border: 1px solid #1976D2;
+            }
+            """
+        )
+        self.auto_button.setFixedSize(150, 40)  # Set fixed size
+        left_panel.addWidget(self.auto_button)
+
         # Admin Login Button
         self.admin_button = QPushButton('Admin Login', self)
         self.admin_button.setFont(QFont("Arial", 10))  # Smaller font size
@@ -183,6 +296,11 @@ class FaceRecognitionApp(QWidget):
         self.total_attendance_label.setStyleSheet("color: #333;")
         right_panel.addWidget(self.total_attendance_label)
 
+        self.rate_label = QLabel('Preview: 0.0 fps\nRecognition: 0.0 faces/s', self)
+        self.rate_label.setFont(QFont("Arial", 10))
+        self.rate_label.setStyleSheet("color: #666;")
+        right_panel.addWidget(self.rate_label)
+
         # Add left and right panels to the main layout
         main_layout.addLayout(left_panel, 70)  # 70% width for left panel
         main_layout.addLayout(right_panel, 30)  # 30% width for right panel
@@ -198,69 +316,239 @@ class FaceRecognitionApp(QWidget):
         self.update_total_attendance()
     
     def update_frame(self):
-        ret, frame = self.video_capture.read()
-        if ret:
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            height, width, channel = frame.shape
-            step = channel * width
-            qImg = QImage(frame.data, width, height, step, QImage.Format_RGB888)
-            self.video_label.setPixmap(QPixmap.fromImage(qImg))
+        with metrics.span('update_frame'):
+            self.update_previews()
+
+    def update_previews(self):
+        for camera_id, grabber in self.cameras.items():
+            frame, seq = grabber.latest()
+            if frame is None or seq == self.last_frame_seq[camera_id]:
+                continue
+            self.last_frame_seq[camera_id] = seq
+            self.frame_count[camera_id] += 1
+            self.rate_frames[camera_id] += 1
+            if self.auto_button.isChecked() and self.frame_count[camera_id] % config.RECOGNIZE_EVERY_N_FRAMES == 0:
+                # Replaces this camera's frame if it is still waiting for a worker.
+                # Faces already identified by the tracker are located but not re-encoded.
+                tracker = self.trackers.get(camera_id)
+                skip_boxes = tracker.skip_boxes() if tracker is not None else ()
+                self.recognition.submit(frame, tag="auto", scale=config.DETECTION_SCALE, source=camera_id,
+                                        skip_boxes=skip_boxes)
+
+            # The renderer never writes to frame, so recognition can share it
+            video_label = self.video_labels[camera_id]
+            size = video_label.size()
+            with metrics.span('render'):
+                image = self.renderers[camera_id].render(
+                    frame, (size.width(), size.height()), partial(self.draw_overlay, camera_id=camera_id))
+            video_label.set_image(image)
     
-    def capture_face(self):
-        ret, frame = self.video_capture.read()
-        if not ret:
-            self.status_label.setText("Error: Failed to capture frame")
+    def draw_overlay(self, frame, scale=1.0, camera_id=None):
+        """Draw a box and name for each face from the camera's latest recognition result."""
+        if self.stats_lines:
+            self.draw_stats(frame)
+        shown_at, locations, names = self.overlay[camera_id]
+        if time.monotonic() - shown_at > OVERLAY_SECONDS:
             return
-        
-        image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        face_encodings = face_recognition.face_encodings(image)
-        
-        if not face_encodings:
-            self.status_label.setText("No face detected!")
+        for (top, right, bottom, left), name in zip(locations, names):
+            top, right, bottom, left = (int(v * scale) for v in (top, right, bottom, left))
+            color = (76, 175, 80) if name is not None else (217, 83, 79)
+            cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
+            cv2.rectangle(frame, (left, bottom), (right, bottom + 22), color, cv2.FILLED)
+            cv2.putText(frame, name or "Unknown", (left + 4, bottom + 16),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+
+    def draw_stats(self, frame):
+        """Draw the performance overlay in the top left corner."""
+        width = max(cv2.getTextSize(line, cv2.FONT_HERSHEY_SIMPLEX, 0.45, 1)[0][0] for line in self.stats_lines)
+        cv2.rectangle(frame, (4, 4), (width + 20, 10 + 16 * len(self.stats_lines)), (0, 0, 0), cv2.FILLED)
+        for row, line in enumerate(self.stats_lines):
+            cv2.putText(frame, line, (8, 20 + row * 16), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 0), 1)
+
+    def set_status(self, text, camera_id=None):
+        """Show a status message, naming the camera when there is more than one."""
+        if camera_id is not None and len(self.camera_sources) > 1:
+            text = f"[{camera_id}] {text}"
+        self.status_label.setText(text)
+
+    @metrics.timed('capture_face')
+    def capture_face(self, checked=False):
+        camera_id = self.camera_select.currentText()
+        grabber = self.cameras.get(camera_id)
+        if grabber is None:
+            self.set_status("Error: Camera unavailable", camera_id)
             return
-        
-        name = "Unknown"
-        matches = face_recognition.compare_faces(self.known_face_encodings, face_encodings[0], tolerance=0.6)
-        face_distances = face_recognition.face_distance(self.known_face_encodings, face_encodings[0])
-        best_match_index = np.argmin(face_distances) if face_distances.size > 0 else None
-        
-        if best_match_index is not None and matches[best_match_index]:
-            name = self.known_face_names[best_match_index]
-            log_attendance(name)
-            attendance_percentage = self.calculate_attendance_percentage(name)
-            self.status_label.setText(f"Attendance Marked for: {name}\nAttendance Percentage: {attendance_percentage:.2f}%")
-            self.update_total_attendance()  # Update total attendance
+
+        # Same newest frame the preview shows, not a second (possibly stale) read
+        ret, frame = grabber.read()
+        if not ret:
+            self.set_status("Error: Failed to capture frame", camera_id)
+            return
+
+        # Detection and encoding run on the worker pool; the result comes back
+        # through on_recognition_result so the preview keeps updating meanwhile
+        if self.recognition.submit(frame, tag="capture", source=camera_id):
+            self.set_status("Recognizing...", camera_id)
         else:
-            self.status_label.setText("Face not recognized!")
+            self.set_status("Busy, please try again", camera_id)
+
+    def update_rates(self):
+        """Show the preview frame rate and recognition throughput since the last update."""
+        now = time.monotonic()
+        elapsed = max(now - self.rate_started, 1e-6)
+        faces_per_second = self.recognized_count / elapsed
+        metrics.set_gauge('recognition_faces_per_second', round(faces_per_second, 2))
+        lines = [
+            f"Recognition: {faces_per_second:.1f} faces/s, "
+            f"{self.recognition.pending} running, {self.recognition.waiting} waiting"
+        ]
+        preview_fps = {}
+        for camera_id, grabber in self.cameras.items():
+            camera = grabber.stats()
+            preview_fps[camera_id] = self.rate_frames[camera_id] / elapsed
+            lines.append(
+                f"{camera_id}: preview {preview_fps[camera_id]:.1f} fps, "
+                f"camera {camera['grab_fps']:.1f} fps, {camera['dropped']} dropped, "
+                f"{camera['latency_ms']:.1f} ms latency"
+            )
+            metrics.set_gauge('preview_fps', round(preview_fps[camera_id], 2), camera=camera_id)
+            metrics.set_gauge('camera_fps', round(camera['grab_fps'], 2), camera=camera_id)
+            metrics.set_gauge('camera_dropped_frames', camera['dropped'], camera=camera_id)
+            self.rate_frames[camera_id] = 0
+        if self.trackers:
+            ratios = {camera_id: tracker.skip_ratio() for camera_id, tracker in self.trackers.items()}
+            lines.append("Tracking: " + ", ".join(
+                f"{camera_id} {ratio * 100:.0f}%" for camera_id, ratio in ratios.items()
+            ) + " of faces skipped the encoder")
+            for camera_id, ratio in ratios.items():
+                metrics.set_gauge('tracked_encoder_skip_ratio', round(ratio, 3), camera=camera_id)
+        self.rate_label.setText("\n".join(lines))
+
+        if config.METRICS_OVERLAY:
+            stages = metrics.REGISTRY.snapshot()['stages']
+            self.stats_lines = [
+                f"FPS {' / '.join(f'{fps:.0f}' for fps in preview_fps.values())}  "
+                f"queue {self.recognition.pending}+{self.recognition.waiting}"
+            ] + [
+                f"{stage} {stages[stage]['p50'] * 1000:.1f} / {stages[stage]['p99'] * 1000:.1f} ms"
+                for stage in OVERLAY_STAGES if stage in stages and 'p50' in stages[stage]
+            ]
+        self.recognized_count = 0
+        self.rate_started = now
+
+    def on_recognition_result(self, result):
+        """Handle a finished recognition job on the GUI thread."""
+        self.recognized_count += sum(result.encoded)
+        if result.error:
+            self.set_status(f"Error: {result.error}", result.source)
+            return
 
-    def calculate_attendance_percentage(self, name):
-        """Calculate the attendance percentage for a given person."""
-        if not os.path.exists(ATTENDANCE_FILE):
-            return 0.0
+        candidates = None
+        tracker = self.trackers.get(result.source)
+        if result.tag == "auto" and tracker is not None:
+            # Tracked faces carry their track's identity; only newly confirmed ones get logged
+            labels, candidates = tracker.update(result.locations, result.names, result.distances, result.encoded)
+            result = result._replace(names=labels)
+
+        # Boxes and names stay on the camera's preview for a moment after each result
+        if result.source in self.overlay:
+            self.overlay[result.source] = (time.monotonic(), result.locations, result.names)
+
+        try:
+            if result.tag == "auto":
+                self.handle_auto_result(result, candidates)
+            else:
+                self.handle_capture_result(result)
+        except ServiceError as e:
+            self.set_status(f"Error: {e}", result.source)
+
+    def handle_capture_result(self, result):
+        """Log the people in a frame taken with the Capture Face button."""
+        if not result.names:
+            self.set_status("No face detected!", result.source)
+            return
 
-        df = pd.read_csv(ATTENDANCE_FILE)
-        user_row = df[df["Name"] == name]
+        names = [name for name in result.names if name is not None]
+        if not names:
+            self.set_status("Face not recognized!", result.source)
+            return
 
-        if user_row.empty:
-            return 0.0
+        self.mark_attendance(names, result.source, result.tag)
+
+    def handle_auto_result(self, result, candidates=None):
+        """Log every recognized face from a hands-free frame, honouring the per-identity cooldown.
+
+        candidates, when tracking, are the identities the tracker confirmed in
+        this frame; faces it was already following are not logged again.
+        """
+        now = time.monotonic()
+        names = []
+        for name in (result.names if candidates is None else candidates):
+            if name is None:
+                continue
+            if now - self.last_seen.get(name, float("-inf")) < config.IDENTITY_COOLDOWN_SECONDS:
+                continue
+            names.append(name)
+
+        if names:
+            self.mark_attendance(names, result.source, result.tag)
+
+    def call_attendance(self, job, on_done, camera_id=None):
+        """Run job() against the attendance backend and pass its result to on_done on the GUI thread.
+
+        Local attendance answers from memory and runs right here; service calls
+        go to the attendance thread, so a slow service never freezes the previews.
+        """
+        if self.attendance_executor is None:
+            on_done(job())
+            return
+        try:
+            future = self.attendance_executor.submit(job)
+        except RuntimeError:
+            # Shut down while the window closes
+            return
 
-        days_present = user_row["Days Present"].values[0]
-        days_absent = user_row["Days Absent"].values[0]
-        total_days = days_present + days_absent
+        def finished(f):
+            if not f.cancelled():
+                self.attendance_done.emit(on_done, None if f.exception() else f.result(), f.exception(), camera_id)
+        future.add_done_callback(finished)
 
-        if total_days == 0:
-            return 0.0
+    def on_attendance_done(self, on_done, result, error, camera_id):
+        if error is not None:
+            self.set_status(f"Error: {error}", camera_id)
+            return
+        on_done(result)
+
+    def mark_attendance(self, names, camera_id=None, tag="auto"):
+        """Log a group of people recognized by one camera in one write and show the outcome."""
+        now = time.monotonic()
+        for name in names:
+            self.last_seen[name] = now
+        self.call_attendance(partial(check_in_many, names, camera_id or ""),
+                             partial(self.on_checked_in, names, camera_id, tag), camera_id)
+
+    def on_checked_in(self, names, camera_id, tag, result):
+        """Show who was newly marked, with their attendance percentage."""
+        marked, total = result
+        if not marked:
+            if tag == "capture":
+                QMessageBox.information(None, "Attendance", "Attendance for today is already marked.")
+            else:
+                self.set_status(f"Attendance already marked for: {', '.join(names)}", camera_id)
+            return
 
-        return (days_present / total_days) * 100
+        lines = [
+            f"Attendance Marked for: {name}\nAttendance Percentage: {attendance_percentage:.2f}%"
+            for name, attendance_percentage in marked.items()
+        ]
+        self.set_status("\n".join(lines), camera_id)
+        self.show_total_attendance(total)
 
     def update_total_attendance(self):
         """Update the total attendance count."""
-        if not os.path.exists(ATTENDANCE_FILE):
-            self.total_attendance_label.setText("Total Attendance: 0")
-            return
+        self.call_attendance(lambda: get_attendance().total_present(), self.show_total_attendance)
 
-        df = pd.read_csv(ATTENDANCE_FILE)
-        total_attendance = df["Days Present"].sum()
+    def show_total_attendance(self, total_attendance):
         self.total_attendance_label.setText(f"Total Attendance: {total_attendance}")
 
     def admin_login(self):
@@ -273,10 +561,53 @@ class FaceRecognitionApp(QWidget):
             QMessageBox.critical(self, "Login Failed", "Invalid credentials!")
 
     def open_admin_page(self):
-        os.system("python admin_page.py")  # Open the admin panel
+        """Show the admin panel in this process instead of starting a new interpreter."""
+        if self.admin_page is None:
+            self.admin_page = AdminPage()
+            self.admin_page.closed.connect(self.on_admin_closed)
+        self.admin_page.show()
+        self.admin_page.raise_()
+
+    def on_admin_closed(self):
+        """Pick up faces registered or deleted in the admin panel."""
+        self.admin_page = None
+        if self.service is not None:
+            try:
+                self.service.reload()
+            except ServiceError as e:
+                self.set_status(f"Error: {e}")
+        elif self.gallery_watcher is not None:
+            self.gallery_watcher.wake()
+        else:
+            self.known_face_encodings, self.known_face_names = load_known_faces()
+            self.face_index = build_index(self.known_face_encodings, self.known_face_names)
+            self.recognition.face_index = self.face_index
+        self.update_total_attendance()
+
+    def on_gallery_updated(self, index, added, removed):
+        """Swap in the index the gallery watcher built; frames in flight finish on the old one."""
+        self.face_index = index
+        self.recognition.face_index = index
+        changes = [f"added {', '.join(added)}"] if added else []
+        if removed:
+            changes.append(f"removed {', '.join(removed)}")
+        if changes:
+            self.set_status(f"Gallery updated: {'; '.join(changes)}")
 
     def closeEvent(self, event):
-        self.video_capture.release()
+        if self.admin_page is not None:
+            self.admin_page.closed.disconnect()
+            self.admin_page.close()
+        if self.gallery_watcher is not None:
+            self.gallery_watcher.stop()
+        self.recognition.shutdown()
+        if self.attendance_executor is not None:
+            self.attendance_executor.shutdown(wait=False, cancel_futures=True)
+        get_attendance().close()
+        if self.metrics_dumper is not None:
+            self.metrics_dumper.stop()
+        for grabber in self.cameras.values():
+            grabber.release()
         cv2.destroyAllWindows()
         event.accept()
 
@@ -0,0 +1,241 @@
+import csv
+import glob
+import os
+import threading
+from datetime import datetime
+
+import config
+import metrics
+from file_lock import lock_file, unlock_file
+
+JOURNAL_DIR = 'attendance_logs'
+# Held while a process looks for stale journals, so two never replay the same one
+JOURNAL_LOCK = 'journal.lock'
+
+
+class AttendanceCache:
+    """Process-wide attendance state in memory, written to the store behind the caller's back.
+
+    Today's marked names are a set, so "already marked today" never touches the
+    store. Check-ins are appended to a journal file and queued; a background
+    thread writes the queue to the store in one transaction every flush_interval
+    seconds and on close(). Journal entries left over from a crash are replayed
+    into the store on the next start, which is safe because the store ignores
+    events it already has.
+
+    Every process has its own journal, attendance.<pid>.journal, and holds an
+    OS lock on <journal>.lock while it runs. A journal whose lock nobody holds
+    belongs to a process that is gone, and only those are replayed.
+
+    Other processes (the admin panel, a second kiosk) see check-ins once they
+    are flushed.
+    """
+
+    def __init__(self, store, journal_dir=JOURNAL_DIR, flush_interval=config.ATTENDANCE_FLUSH_SECONDS):
+        self.store = store
+        self.journal_dir = journal_dir
+        self.journal_path = os.path.join(journal_dir, f'attendance.{os.getpid()}.journal')
+        self.lock = threading.RLock()
+        self.flush_lock = threading.Lock()
+        self.pending = []  # (name, datetime, camera, first check-in of the day) not yet in the store
+        os.makedirs(journal_dir, exist_ok=True)
+        with open(os.path.join(journal_dir, JOURNAL_LOCK), 'a+b') as dir_lock:
+            lock_file(dir_lock)
+            try:
+                self._replay_stale_journals()
+                # Claimed before the journal exists, so no other process ever takes it for stale
+                self.owner = open(self.journal_path + '.lock', 'a+b')
+                lock_file(self.owner)
+            finally:
+                unlock_file(dir_lock)
+        self.journal = open(self.journal_path, 'a', newline='')
+        self.writer = csv.writer(self.journal)
+        self._load_day(datetime.now().strftime('%Y-%m-%d'))
+
+        self._stop = threading.Event()
+        self.flush_interval = flush_interval
+        self.thread = threading.Thread(target=self._flush_loop, name='attendance-flush', daemon=True)
+        self.thread.start()
+
+    def _replay_stale_journals(self):
+        """Push check-ins from processes that exited before they reached the store."""
+        # attendance.journal is the single shared journal of older versions
+        paths = glob.glob(os.path.join(self.journal_dir, 'attendance.*.journal'))
+        paths.append(os.path.join(self.journal_dir, 'attendance.journal'))
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            with open(path + '.lock', 'a+b') as owner:
+                if not lock_file(owner, blocking=False):
+                    continue  # its process is still running
+                try:
+                    self._replay_journal(path)
+                finally:
+                    unlock_file(owner)
+            os.remove(path + '.lock')
+
+    def _replay_journal(self, path):
+        """Push the check-ins in one stale journal to the store and delete it."""
+        # A rewrite cut short by the crash; the journal itself still has every line
+        if os.path.exists(path + '.tmp'):
+            os.remove(path + '.tmp')
+        with open(path, 'r', newline='') as f:
+            events = [
+                (row[0], datetime.fromisoformat(row[1]), row[2])
+                for row in csv.reader(f) if len(row) == 3
+            ]
+        if events:
+            self.store.record_events(events)
+        os.remove(path)
+
+    def _load_day(self, date):
+        """Reset the in-memory state from the store for a new day."""
+        self.date = date
+        self.marked_today = self.store.marked_on(date)
+        self.new_today = set()  # marked in memory but not yet flushed
+        # Whether the store already counts today as a session day; if not, the
+        # first flush will make it one and add an absence to everybody else
+        self.session_in_store = bool(self.marked_today)
+        self.base_counters = self.store.all_counters()
+        self.base_total = self.store.total_present()
+
+    def mark_present(self, names, when=None, camera=""):
+        """Record a check-in for several people; returns {name: first check-in today}."""
+        when = when or datetime.now()
+        date = when.strftime('%Y-%m-%d')
+        if date != self.date:
+            self._roll_over(date)
+        marked = {}
+        with self.lock:
+            for name in dict.fromkeys(names):
+                marked[name] = name not in self.marked_today
+                if marked[name]:
+                    self.marked_today.add(name)
+                    self.new_today.add(name)
+                self.pending.append((name, when, camera, marked[name]))
+                self.writer.writerow([name, when.isoformat(timespec='milliseconds'), camera or ""])
+            # Hand the lines to the OS so they survive a crash of this process
+            self.journal.flush()
+        return marked
+
+    def _roll_over(self, date):
+        """Flush yesterday's check-ins and start counting a new day."""
+        self.flush()
+        with self.lock:
+            self._load_day(date)
+
+    def counters(self, name):
+        """Return (days_present, days_absent) including check-ins not flushed yet."""
+        with self.lock:
+            base = self.base_counters.get(name)
+            if base is None:
+                return (1, 0) if name in self.new_today else None
+            days_present, days_absent = base
+            if name in self.new_today:
+                days_present += 1
+                if self.session_in_store:
+                    # The store had counted today as an absence for this person
+                    days_absent -= 1
+            elif self.new_today and not self.session_in_store and name not in self.marked_today:
+                days_absent += 1
+            return days_present, max(0, days_absent)
+
+    def percentage(self, name):
+        """Calculate the attendance percentage for a given person."""
+        counts = self.counters(name)
+        if counts is None:
+            return 0.0
+        days_present, days_absent = counts
+        total_days = days_present + days_absent
+        if total_days == 0:
+            return 0.0
+        return (days_present / total_days) * 100
+
+    def total_present(self):
+        with self.lock:
+            return self.base_total + len(self.new_today)
+
+    def flush(self):
+        """Write queued check-ins to the store in one batch."""
+        with self.flush_lock:
+            with self.lock:
+                events = list(self.pending)
+            if not events:
+                return
+
+            # Make sure the journal is on disk before relying on the store write
+            with metrics.span('journal_fsync'):
+                os.fsync(self.journal.fileno())
+            with metrics.span('store_write'):
+                self.store.record_events([event[:3] for event in events])
+                base_counters = self.store.all_counters()
+                base_total = self.store.total_present()
+
+            with self.lock:
+                # Keep only what arrived during the write, in memory and in the journal.
+                # A crash before the journal swap just replays events the store ignores.
+                self.pending = self.pending[len(events):]
+                remaining = list(self.pending)
+
+                if any(when.strftime('%Y-%m-%d') == self.date for _, when, _, _ in events):
+                    self.session_in_store = True
+                self.new_today = {
+                    name for name, when, _, new in self.pending
+                    if new and when.strftime('%Y-%m-%d') == self.date
+                }
+                self.base_counters = base_counters
+                self.base_total = base_total
+
+            self._rewrite_journal(remaining)
+
+    def _rewrite_journal(self, remaining):
+        """Replace the journal with the check-ins still pending, without ever truncating it in place.
+
+        The new contents go to a temporary file that is synced and then renamed
+        over the journal, so after a crash the journal is either the old one or
+        the new one, never an empty file with pending check-ins lost. The file
+        is written and synced outside self.lock; check-ins that arrive
+        meanwhile are appended to it during the rename, which is all the lock
+        is held for.
+        """
+        tmp_path = self.journal_path + '.tmp'
+        tmp = open(tmp_path, 'w', newline='')
+        writer = csv.writer(tmp)
+        for name, when, camera, _ in remaining:
+            writer.writerow([name, when.isoformat(timespec='milliseconds'), camera or ""])
+        tmp.flush()
+        os.fsync(tmp.fileno())
+        with self.lock:
+            # Same durability as mark_present(): handed to the OS, synced by the next flush
+            for name, when, camera, _ in self.pending[len(remaining):]:
+                writer.writerow([name, when.isoformat(timespec='milliseconds'), camera or ""])
+            tmp.close()
+            self.journal.close()
+            os.replace(tmp_path, self.journal_path)
+            self.journal = open(self.journal_path, 'a', newline='')
+            self.writer = csv.writer(self.journal)
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                # Keep the journal and retry on the next tick
+                print(f"Attendance flush failed: {e}")
+
+    def close(self):
+        """Flush everything and close the store."""
+        self._stop.set()
+        self.thread.join()
+        self.flush()
+        with self.lock:
+            self.journal.close()
+            if os.path.exists(self.journal_path) and os.path.getsize(self.journal_path) == 0:
+                os.remove(self.journal_path)
+                # Nothing left to replay: give up the journal name for good
+                unlock_file(self.owner)
+                self.owner.close()
+                os.remove(self.journal_path + '.lock')
+            else:
+                self.owner.close()
+        self.store.close()
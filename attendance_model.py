@@ -0,0 +1,84 @@
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+from attendance_store import TABLE_COLUMNS
+
+PAGE_SIZE = 200
+
+
+class AttendanceTableModel(QAbstractTableModel):
+    """Table model that pages attendance records out of the store on demand.
+
+    Only the rows scrolled into view are fetched (canFetchMore/fetchMore), and
+    sorting and searching are passed to the store as part of the query, so the
+    cost of opening the admin panel does not grow with the roster size.
+    """
+
+    def __init__(self, store, page_size=PAGE_SIZE, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.page_size = page_size
+        self.search = ""
+        self.sort_column = "Name"
+        self.descending = False
+        self.rows = []
+        self.total = 0
+        self.refresh()
+
+    def refresh(self):
+        """Drop the loaded pages and fetch the first one again."""
+        self.beginResetModel()
+        self.total = self.store.count_records(self.search)
+        self.rows = self._fetch(0)
+        self.endResetModel()
+
+    def set_search(self, text):
+        self.search = text
+        self.refresh()
+
+    def _fetch(self, offset):
+        return self.store.query_records(
+            self.search, self.sort_column, self.descending, offset=offset, limit=self.page_size
+        )
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(TABLE_COLUMNS)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and len(self.rows) < self.total
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        page = self._fetch(len(self.rows))
+        if not page:
+            # The store shrank under us (e.g. a deletion elsewhere)
+            self.total = len(self.rows)
+            return
+        self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(page) - 1)
+        self.rows.extend(page)
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        value = self.rows[index.row()][index.column()]
+        return "" if value is None else str(value)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return TABLE_COLUMNS[section]
+        return str(section + 1)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.sort_column = TABLE_COLUMNS[column]
+        self.descending = order == Qt.DescendingOrder
+        self.refresh()
+
+    def name_at(self, row):
+        """Return the name in a loaded row."""
+        return self.rows[row][0]
@@ -0,0 +1,948 @@
+import argparse
+import csv
+import os
+import sqlite3
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime
+import pandas as pd
+
+import config
+
+# Define paths
+ATTENDANCE_DIR = 'attendance_logs'
+LEGACY_CSV_FILE = os.path.join(ATTENDANCE_DIR, 'attendance.csv')
+SQLITE_FILE = os.path.join(ATTENDANCE_DIR, 'attendance.db')
+EVENT_LOG_FILE = os.path.join(ATTENDANCE_DIR, 'attendance_events.csv')
+
+# Column layout of the original attendance.csv, kept for exports
+CSV_COLUMNS = ["Name", "Roll No", "Branch", "Mobile No", "Date", "Days Present", "Days Absent", "Absent Dates"]
+
+# Columns shown in the admin panel
+TABLE_COLUMNS = CSV_COLUMNS + ["Attendance Percentage"]
+
+# Columns matched by the admin panel search box
+SEARCH_COLUMNS = ["Name", "Roll No", "Branch"]
+
+
+def today():
+    return datetime.now().strftime('%Y-%m-%d')
+
+
+def now_time():
+    return datetime.now().strftime('%H:%M:%S')
+
+
+def term_for(date):
+    """Return the term a 'YYYY-MM-DD' date falls in, e.g. '2026-T2'."""
+    year, month = int(date[:4]), int(date[5:7])
+    index = sum(1 for start in config.TERM_START_MONTHS if start <= month)
+    if index == 0:
+        return f"{year - 1}-T{len(config.TERM_START_MONTHS)}"
+    return f"{year}-T{index}"
+
+
+def current_term():
+    return term_for(today())
+
+
+def read_legacy_csv(path):
+    """Read an old-style attendance.csv into a list of row dicts, tolerating missing columns."""
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    rows = []
+    for record in df.to_dict('records'):
+        rows.append({
+            'name': record.get('Name', ''),
+            'roll_no': record.get('Roll No', ''),
+            'branch': record.get('Branch', ''),
+            'mobile_no': record.get('Mobile No', ''),
+            'last_date': record.get('Date', '') or None,
+            'days_present': int(float(record.get('Days Present') or 0)),
+            'days_absent': int(float(record.get('Days Absent') or 0)),
+            'absent_dates': record.get('Absent Dates', ''),
+        })
+    return [row for row in rows if row['name']]
+
+
+class AttendanceStore:
+    """Common interface of the attendance backends.
+
+    Every check-in is kept as an event (person, date, timestamp, camera). The
+    days present of each person, overall and per term, are counters updated as
+    events arrive, and the number of session days (days with at least one
+    check-in) is counted the same way. Days absent are derived from those
+    counters: sessions since the person enrolled minus days present. Lookups
+    never rescan the history.
+    """
+
+    def register_many(self, people):
+        """Add (name, roll_no, branch, mobile_no) tuples in one transaction.
+
+        Returns a list telling for each person whether they were newly added.
+        """
+        raise NotImplementedError
+
+    def register(self, name, roll_no="", branch="", mobile_no=""):
+        """Add a person; returns False if they are already registered."""
+        return self.register_many([(name, roll_no, branch, mobile_no)])[0]
+
+    def record_events(self, events):
+        """Store (name, datetime, camera) check-ins in one batch.
+
+        Returns a list telling for each event whether it was the person's first
+        check-in that day. Replaying an event that is already stored is a no-op.
+        """
+        raise NotImplementedError
+
+    def marked_on(self, date):
+        """Return the set of names with a check-in on a date."""
+        raise NotImplementedError
+
+    def delete(self, name):
+        """Remove a person and their attendance history."""
+        raise NotImplementedError
+
+    def counters(self, name, term=None):
+        """Return (days_present, days_absent) overall or for one term, or None if unknown."""
+        raise NotImplementedError
+
+    def total_present(self):
+        """Return the sum of days present over everybody."""
+        raise NotImplementedError
+
+    def all_counters(self):
+        """Return {name: (days_present, days_absent)} for everybody."""
+        raise NotImplementedError
+
+    def history(self, name, start=None, end=None):
+        """Return the (date, timestamp, camera) check-ins of a person, oldest first."""
+        raise NotImplementedError
+
+    def students_frame(self):
+        """Return a DataFrame of everybody with name, roll_no, branch, enrolled_date and migrated_through columns.
+
+        migrated_through is the last session day already summed in the counters of
+        a migrated row (one with no enrolled_date), '' for everybody else.
+        """
+        raise NotImplementedError
+
+    def session_dates(self):
+        """Return the session days, oldest first."""
+        raise NotImplementedError
+
+    def presence_frame(self, start=None, end=None):
+        """Return the days people were present as a DataFrame of name and date, ordered by date."""
+        raise NotImplementedError
+
+    def count_presence(self, before=None):
+        """Return how many (person, day) presences there are, optionally only before a date."""
+        raise NotImplementedError
+
+    def iter_events(self, start=None, end=None, chunk_size=100000):
+        """Yield the check-ins between two dates as DataFrames of at most chunk_size rows.
+
+        The columns are name, date, timestamp and camera, oldest first.
+        """
+        raise NotImplementedError
+
+    def records(self, absent_dates=False):
+        """Return every person as a dict in the legacy CSV layout.
+
+        Listing absent dates needs a scan of the session days, so it is only
+        done when asked for (exports).
+        """
+        raise NotImplementedError
+
+    def import_legacy(self, rows):
+        """Load rows produced by read_legacy_csv()."""
+        raise NotImplementedError
+
+    def is_empty(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def mark_present(self, names, when=None, camera=""):
+        """Record a check-in for several people; returns {name: first check-in today}."""
+        when = when or datetime.now()
+        names = list(dict.fromkeys(names))
+        return dict(zip(names, self.record_events([(name, when, camera) for name in names])))
+
+    def percentage(self, name, term=None):
+        """Calculate the attendance percentage for a given person."""
+        counts = self.counters(name, term)
+        if counts is None:
+            return 0.0
+        days_present, days_absent = counts
+        total_days = days_present + days_absent
+        if total_days == 0:
+            return 0.0
+        return (days_present / total_days) * 100
+
+    def count_records(self, search=""):
+        """Return how many people match the search text."""
+        return len(self._filtered(search))
+
+    def query_records(self, search="", sort_column="Name", descending=False, offset=0, limit=None):
+        """Return one page of TABLE_COLUMNS tuples, filtered and sorted by the store."""
+        rows = self._filtered(search)
+        index = TABLE_COLUMNS.index(sort_column)
+        rows.sort(key=lambda row: (row[index] is None, row[index]), reverse=descending)
+        end = None if limit is None else offset + limit
+        return rows[offset:end]
+
+    def _filtered(self, search):
+        """Generic search over records(); backends with a query engine override the callers."""
+        search = search.strip().lower()
+        rows = []
+        for record in self.records():
+            if search and not any(search in str(record[column]).lower() for column in SEARCH_COLUMNS):
+                continue
+            total_days = record["Days Present"] + record["Days Absent"]
+            percentage = round(record["Days Present"] / total_days * 100, 2) if total_days else 0.0
+            rows.append(tuple(record[column] for column in CSV_COLUMNS) + (percentage,))
+        return rows
+
+    def to_dataframe(self, absent_dates=False):
+        """Return the attendance records as a DataFrame with the legacy CSV columns."""
+        return pd.DataFrame(self.records(absent_dates), columns=CSV_COLUMNS)
+
+    def export_csv(self, path):
+        """Write the records in the original attendance.csv format."""
+        self.to_dataframe(absent_dates=True).to_csv(path, index=False)
+
+
+def _join_dates(*parts):
+    return ", ".join(part for part in parts if part)
+
+
+class SQLiteAttendanceStore(AttendanceStore):
+    """Attendance kept in an SQLite database in WAL mode.
+
+    Check-ins go to the events table. The first one per person and day also
+    bumps the materialized counters in students and term_counters, and the first
+    one of the day overall bumps the session totals. Several processes can
+    safely share the database.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS students (
+            name TEXT PRIMARY KEY,
+            roll_no TEXT NOT NULL DEFAULT '',
+            branch TEXT NOT NULL DEFAULT '',
+            mobile_no TEXT NOT NULL DEFAULT '',
+            days_present INTEGER NOT NULL DEFAULT 0,
+            absent_dates TEXT NOT NULL DEFAULT '',
+            last_date TEXT,
+            enrolled_date TEXT,
+            session_offset INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_students_roll_no ON students (roll_no);
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            date TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            camera TEXT NOT NULL DEFAULT '',
+            UNIQUE (name, timestamp, camera)
+        );
+        CREATE INDEX IF NOT EXISTS idx_events_name_date ON events (name, date);
+        CREATE INDEX IF NOT EXISTS idx_events_date ON events (date);
+        CREATE TABLE IF NOT EXISTS attendance (
+            name TEXT NOT NULL,
+            date TEXT NOT NULL,
+            time TEXT,
+            PRIMARY KEY (name, date)
+        );
+        CREATE INDEX IF NOT EXISTS idx_attendance_date ON attendance (date);
+        CREATE TABLE IF NOT EXISTS sessions (
+            date TEXT PRIMARY KEY,
+            term TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_sessions_term ON sessions (term, date);
+        CREATE TABLE IF NOT EXISTS session_totals (
+            term TEXT PRIMARY KEY,
+            sessions INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS term_counters (
+            name TEXT NOT NULL,
+            term TEXT NOT NULL,
+            days_present INTEGER NOT NULL DEFAULT 0,
+            session_offset INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (name, term)
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+    """
+
+    # session_totals key holding the count over all terms
+    ALL_TERMS = '*'
+    # meta key holding the last session day counted in migrated rows' old totals
+    MIGRATED_THROUGH = 'migrated_through'
+
+    def __init__(self, path=SQLITE_FILE):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._upgrade()
+        self.conn.executescript(self.SCHEMA)
+
+    def _upgrade(self):
+        """Add the counter columns to databases created before per-event history."""
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(students)")}
+        if not columns or 'session_offset' in columns:
+            return
+        self.conn.execute("ALTER TABLE students ADD COLUMN enrolled_date TEXT")
+        self.conn.execute("ALTER TABLE students ADD COLUMN session_offset INTEGER NOT NULL DEFAULT 0")
+        self.conn.executescript(self.SCHEMA)
+        with self.transaction() as cur:
+            dates = [row[0] for row in cur.execute("SELECT DISTINCT date FROM attendance")]
+            self._add_sessions(cur, dates)
+            cur.execute(
+                "INSERT OR IGNORE INTO events (name, date, timestamp) "
+                "SELECT name, date, date || 'T' || COALESCE(time, '00:00:00') FROM attendance"
+            )
+            # Keep the old days_absent values: absent = sessions - offset - present
+            cur.execute(
+                "UPDATE students SET session_offset = "
+                "(SELECT sessions FROM session_totals WHERE term = ?) - days_present - days_absent",
+                (self.ALL_TERMS,),
+            )
+            for date in dates:
+                cur.execute(
+                    "INSERT INTO term_counters (name, term, days_present) "
+                    "SELECT name, ?, 1 FROM attendance WHERE date = ? "
+                    "ON CONFLICT (name, term) DO UPDATE SET days_present = days_present + 1",
+                    (term_for(date), date),
+                )
+            self._set_migrated_through(cur)
+
+    def _set_migrated_through(self, cur):
+        """Remember the last session day already covered by migrated rows' absent_dates."""
+        cur.execute(
+            "INSERT OR REPLACE INTO meta (key, value) SELECT ?, COALESCE(MAX(date), '') FROM sessions",
+            (self.MIGRATED_THROUGH,),
+        )
+
+    def transaction(self):
+        return _Transaction(self)
+
+    def _add_sessions(self, cur, dates):
+        """Count any of these dates not yet seen as session days."""
+        for date in dates:
+            cur.execute("INSERT OR IGNORE INTO sessions (date, term) VALUES (?, ?)", (date, term_for(date)))
+            if cur.rowcount == 1:
+                cur.executemany(
+                    "INSERT INTO session_totals (term, sessions) VALUES (?, 1) "
+                    "ON CONFLICT (term) DO UPDATE SET sessions = sessions + 1",
+                    [(term_for(date),), (self.ALL_TERMS,)],
+                )
+
+    def _sessions(self, cur, term):
+        row = cur.execute("SELECT sessions FROM session_totals WHERE term = ?", (term,)).fetchone()
+        return row[0] if row else 0
+
+    def _enroll(self, cur, name, date, roll_no="", branch="", mobile_no=""):
+        """Insert a student row; sessions before the enrollment date never count as absences."""
+        cur.execute(
+            "INSERT OR IGNORE INTO students (name, roll_no, branch, mobile_no, enrolled_date, session_offset) "
+            "VALUES (?, ?, ?, ?, ?, (SELECT COUNT(*) FROM sessions WHERE date < ?))",
+            (name, roll_no, branch, mobile_no, date, date),
+        )
+        return cur.rowcount == 1
+
+    def register_many(self, people):
+        date = today()
+        with self.transaction() as cur:
+            return [
+                self._enroll(cur, name, date, roll_no, branch, mobile_no)
+                for name, roll_no, branch, mobile_no in people
+            ]
+
+    def record_events(self, events):
+        marked = []
+        with self.transaction() as cur:
+            for name, when, camera in events:
+                date = when.strftime('%Y-%m-%d')
+                term = term_for(date)
+                self._add_sessions(cur, [date])
+                cur.execute(
+                    "INSERT OR IGNORE INTO events (name, date, timestamp, camera) VALUES (?, ?, ?, ?)",
+                    (name, date, when.isoformat(timespec='milliseconds'), camera or ""),
+                )
+                cur.execute(
+                    "INSERT OR IGNORE INTO attendance (name, date, time) VALUES (?, ?, ?)",
+                    (name, date, when.strftime('%H:%M:%S')),
+                )
+                marked.append(cur.rowcount == 1)
+                if not marked[-1]:
+                    continue
+
+                # Unregistered faces still get a row, as the CSV version did
+                self._enroll(cur, name, date)
+                cur.execute(
+                    "UPDATE students SET days_present = days_present + 1, last_date = ? WHERE name = ?",
+                    (date, name),
+                )
+                cur.execute(
+                    "INSERT OR IGNORE INTO term_counters (name, term, session_offset) "
+                    "VALUES (?, ?, (SELECT COUNT(*) FROM sessions WHERE term = ? "
+                    "AND date < (SELECT enrolled_date FROM students WHERE name = ?)))",
+                    (name, term, term, name),
+                )
+                cur.execute(
+                    "UPDATE term_counters SET days_present = days_present + 1 WHERE name = ? AND term = ?",
+                    (name, term),
+                )
+        return marked
+
+    def marked_on(self, date):
+        with self.lock:
+            return {row[0] for row in self.conn.execute("SELECT name FROM attendance WHERE date = ?", (date,))}
+
+    def delete(self, name):
+        with self.transaction() as cur:
+            cur.execute("DELETE FROM events WHERE name = ?", (name,))
+            cur.execute("DELETE FROM attendance WHERE name = ?", (name,))
+            cur.execute("DELETE FROM term_counters WHERE name = ?", (name,))
+            cur.execute("DELETE FROM students WHERE name = ?", (name,))
+
+    def counters(self, name, term=None):
+        with self.lock:
+            cur = self.conn.cursor()
+            student = cur.execute(
+                "SELECT days_present, session_offset, enrolled_date FROM students WHERE name = ?", (name,)
+            ).fetchone()
+            if student is None:
+                return None
+            if term is None:
+                days_present, offset = student[0], student[1]
+                sessions = self._sessions(cur, self.ALL_TERMS)
+            else:
+                row = cur.execute(
+                    "SELECT days_present, session_offset FROM term_counters WHERE name = ? AND term = ?",
+                    (name, term),
+                ).fetchone()
+                if row is None:
+                    # No check-in this term yet
+                    offset = cur.execute(
+                        "SELECT COUNT(*) FROM sessions WHERE term = ? AND date < ?", (term, student[2] or "")
+                    ).fetchone()[0]
+                    row = (0, offset)
+                days_present, offset = row
+                sessions = self._sessions(cur, term)
+        return days_present, max(0, sessions - offset - days_present)
+
+    def total_present(self):
+        with self.lock:
+            return self.conn.execute("SELECT COALESCE(SUM(days_present), 0) FROM students").fetchone()[0]
+
+    def all_counters(self):
+        with self.lock:
+            sessions = self._sessions(self.conn, self.ALL_TERMS)
+            return {
+                name: (days_present, days_absent)
+                for name, days_present, days_absent in self.conn.execute(
+                    "SELECT name, days_present, MAX(0, ? - session_offset - days_present) FROM students",
+                    (sessions,),
+                )
+            }
+
+    def history(self, name, start=None, end=None):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT date, timestamp, camera FROM events WHERE name = ? AND date >= ? AND date <= ? "
+                "ORDER BY date, timestamp",
+                (name, start or "", end or "9999-99-99"),
+            ).fetchall()
+
+    def students_frame(self):
+        with self.lock:
+            return pd.read_sql_query(
+                "SELECT name, roll_no, branch, COALESCE(enrolled_date, '') AS enrolled_date, "
+                "CASE WHEN enrolled_date IS NULL THEN COALESCE((SELECT value FROM meta WHERE key = ?), '') "
+                "ELSE '' END AS migrated_through FROM students ORDER BY rowid",
+                self.conn,
+                params=(self.MIGRATED_THROUGH,),
+            )
+
+    def session_dates(self):
+        with self.lock:
+            return [row[0] for row in self.conn.execute("SELECT date FROM sessions ORDER BY date")]
+
+    def presence_frame(self, start=None, end=None):
+        with self.lock:
+            return pd.read_sql_query(
+                "SELECT name, date FROM attendance WHERE date >= ? AND date <= ? ORDER BY date",
+                self.conn, params=(start or "", end or "9999-99-99"),
+            )
+
+    def count_presence(self, before=None):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM attendance WHERE date < ?", (before or "9999-99-99",)
+            ).fetchone()[0]
+
+    def iter_events(self, start=None, end=None, chunk_size=100000):
+        # A connection of its own, so a long export reads one WAL snapshot
+        # without holding the lock the kiosk writes under
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            yield from pd.read_sql_query(
+                "SELECT name, date, timestamp, camera FROM events WHERE date >= ? AND date <= ? "
+                "ORDER BY date, timestamp",
+                conn, params=(start or "", end or "9999-99-99"), chunksize=chunk_size,
+            )
+        finally:
+            conn.close()
+
+    def records(self, absent_dates=False):
+        with self.lock:
+            sessions = self._sessions(self.conn, self.ALL_TERMS)
+            rows = self.conn.execute(
+                "SELECT name, roll_no, branch, mobile_no, COALESCE(last_date, ''), days_present, "
+                "MAX(0, ? - session_offset - days_present), absent_dates, enrolled_date "
+                "FROM students ORDER BY rowid",
+                (sessions,),
+            ).fetchall()
+            if absent_dates:
+                cutoff = self.conn.execute(
+                    "SELECT value FROM meta WHERE key = ?", (self.MIGRATED_THROUGH,)
+                ).fetchone()
+                # Migrated rows (no enrolled_date) already list their absences up to the migration
+                missed = {}
+                for name, date in self.conn.execute(
+                    "SELECT st.name, se.date FROM students st JOIN sessions se "
+                    "ON se.date >= COALESCE(st.enrolled_date, '') "
+                    "AND (st.enrolled_date IS NOT NULL OR se.date > ?) "
+                    "WHERE NOT EXISTS (SELECT 1 FROM attendance a WHERE a.name = st.name AND a.date = se.date) "
+                    "ORDER BY se.date",
+                    (cutoff[0] if cutoff else '',),
+                ):
+                    missed.setdefault(name, []).append(date)
+                rows = [row[:7] + (_join_dates(row[7], *missed.get(row[0], [])),) for row in rows]
+        return [dict(zip(CSV_COLUMNS, row)) for row in rows]
+
+    # SQL expressions behind TABLE_COLUMNS; ? is the overall session count
+    TABLE_EXPRESSIONS = {
+        "Name": "name",
+        "Roll No": "roll_no",
+        "Branch": "branch",
+        "Mobile No": "mobile_no",
+        "Date": "COALESCE(last_date, '')",
+        "Days Present": "days_present",
+        "Days Absent": "MAX(0, :sessions - session_offset - days_present)",
+        "Absent Dates": "absent_dates",
+        "Attendance Percentage": (
+            "CASE WHEN days_present + MAX(0, :sessions - session_offset - days_present) = 0 THEN 0.0 "
+            "ELSE ROUND(100.0 * days_present / (days_present + MAX(0, :sessions - session_offset - days_present)), 2) END"
+        ),
+    }
+
+    def _where(self, search):
+        if not search.strip():
+            return "", {}
+        clause = " OR ".join(f"{self.TABLE_EXPRESSIONS[column]} LIKE :search" for column in SEARCH_COLUMNS)
+        return f"WHERE {clause}", {"search": f"%{search.strip()}%"}
+
+    def count_records(self, search=""):
+        where, params = self._where(search)
+        with self.lock:
+            return self.conn.execute(f"SELECT COUNT(*) FROM students {where}", params).fetchone()[0]
+
+    def query_records(self, search="", sort_column="Name", descending=False, offset=0, limit=None):
+        where, params = self._where(search)
+        columns = ", ".join(self.TABLE_EXPRESSIONS[column] for column in TABLE_COLUMNS)
+        order = self.TABLE_EXPRESSIONS[sort_column]
+        with self.lock:
+            params.update(
+                sessions=self._sessions(self.conn, self.ALL_TERMS),
+                limit=-1 if limit is None else limit,
+                offset=offset,
+            )
+            return self.conn.execute(
+                f"SELECT {columns} FROM students {where} "
+                f"ORDER BY {order} {'DESC' if descending else 'ASC'}, rowid LIMIT :limit OFFSET :offset",
+                params,
+            ).fetchall()
+
+    def import_legacy(self, rows):
+        with self.transaction() as cur:
+            self._add_sessions(cur, sorted({row['last_date'] for row in rows if row['last_date']}))
+            sessions = self._sessions(cur, self.ALL_TERMS)
+            cur.executemany(
+                "INSERT OR REPLACE INTO students "
+                "(name, roll_no, branch, mobile_no, days_present, absent_dates, last_date, session_offset) "
+                "VALUES (:name, :roll_no, :branch, :mobile_no, :days_present, :absent_dates, :last_date, :offset)",
+                [dict(row, offset=sessions - row['days_present'] - row['days_absent']) for row in rows],
+            )
+            dated = [row for row in rows if row['last_date']]
+            cur.executemany("INSERT OR IGNORE INTO attendance (name, date) VALUES (:name, :last_date)", dated)
+            cur.executemany(
+                "INSERT OR IGNORE INTO term_counters (name, term, days_present) VALUES (?, ?, 1)",
+                [(row['name'], term_for(row['last_date'])) for row in dated],
+            )
+            self._set_migrated_through(cur)
+
+    def is_empty(self):
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM students LIMIT 1").fetchone() is None
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class _Transaction:
+    """Serialize access to the connection and wrap the block in BEGIN IMMEDIATE/COMMIT."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def __enter__(self):
+        self.store.lock.acquire()
+        self.cursor = self.store.conn.cursor()
+        self.cursor.execute("BEGIN IMMEDIATE")
+        return self.cursor
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.cursor.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.store.lock.release()
+        return False
+
+
+class AttendanceCounters:
+    """In-memory version of the materialized counters kept by the SQLite backend."""
+
+    def __init__(self):
+        self.sessions = set()
+        self.term_sessions = Counter()
+        self.people = {}  # name -> record dict in the legacy CSV layout plus counter fields
+        self.present = set()  # (name, date) pairs already marked
+        self.by_date = defaultdict(set)  # date -> names marked that day
+        self.events = set()  # (name, timestamp, camera) of every check-in, to ignore replays
+
+    def mark(self, name, date):
+        self.present.add((name, date))
+        self.by_date[date].add(name)
+
+    @staticmethod
+    def _blank(name, date):
+        return {"Name": name, "Roll No": "", "Branch": "", "Mobile No": "", "Date": "",
+                "Days Present": 0, "Absent Dates": "", "enrolled": date, "offset": 0, "migrated_through": "",
+                "term_present": Counter(), "term_offset": {}, "history": []}
+
+    def add_session(self, date):
+        if date not in self.sessions:
+            self.sessions.add(date)
+            self.term_sessions[term_for(date)] += 1
+
+    def enroll(self, name, date):
+        """Add a person if unknown and return their record."""
+        person = self.people.get(name)
+        if person is None:
+            person = self.people[name] = self._blank(name, date)
+            person["offset"] = sum(1 for session in self.sessions if session < date)
+        return person
+
+    def check_in(self, name, date, timestamp, camera):
+        """Apply a check-in; returns True if it is the person's first one that day."""
+        if (name, timestamp, camera) in self.events:
+            return False
+        self.events.add((name, timestamp, camera))
+        self.add_session(date)
+        person = self.enroll(name, date)
+        person["history"].append((date, timestamp, camera))
+        if (name, date) in self.present:
+            return False
+        self.mark(name, date)
+        term = term_for(date)
+        if term not in person["term_offset"]:
+            person["term_offset"][term] = sum(
+                1 for session in self.sessions if term_for(session) == term and session < person["enrolled"]
+            )
+        person["Days Present"] += 1
+        person["term_present"][term] += 1
+        person["Date"] = date
+        return True
+
+    def remove(self, name):
+        self.people.pop(name, None)
+        self.present = {key for key in self.present if key[0] != name}
+        self.events = {key for key in self.events if key[0] != name}
+        for names in self.by_date.values():
+            names.discard(name)
+
+    def counters(self, name, term=None):
+        person = self.people.get(name)
+        if person is None:
+            return None
+        if term is None:
+            days_present, sessions, offset = person["Days Present"], len(self.sessions), person["offset"]
+        else:
+            days_present = person["term_present"][term]
+            sessions = self.term_sessions[term]
+            offset = person["term_offset"].get(term)
+            if offset is None:
+                offset = sum(1 for s in self.sessions if term_for(s) == term and s < person["enrolled"])
+        return days_present, max(0, sessions - offset - days_present)
+
+    def record(self, name, absent_dates=False):
+        """Return a person in the legacy CSV layout."""
+        person = self.people[name]
+        record = {column: person.get(column, "") for column in CSV_COLUMNS}
+        record["Days Absent"] = self.counters(name)[1]
+        if absent_dates:
+            missed = sorted(
+                date for date in self.sessions
+                if date >= person["enrolled"] and date > person["migrated_through"]
+                and (name, date) not in self.present
+            )
+            record["Absent Dates"] = _join_dates(person["Absent Dates"], *missed)
+        return record
+
+
+class EventLogAttendanceStore(AttendanceStore):
+    """Attendance kept as an append-only CSV event log.
+
+    Every change is one appended line (register, present, delete or a migrated
+    legacy row) and the counters are rebuilt in memory by replaying the log on
+    open. Nothing is ever rewritten, so a crash can lose at most the line being
+    written. Changes made by other processes are seen on the next open.
+    """
+
+    FIELDS = ['op', 'name', 'date', 'time', 'roll_no', 'branch', 'mobile_no',
+              'days_present', 'days_absent', 'absent_dates', 'camera']
+
+    def __init__(self, path=EVENT_LOG_FILE):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.lock = threading.RLock()
+        self.state = AttendanceCounters()
+        if os.path.exists(path):
+            with open(path, 'r', newline='') as f:
+                for event in csv.DictReader(f):
+                    self._apply(event)
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.log = open(path, 'a', newline='')
+        self.writer = csv.DictWriter(self.log, fieldnames=self.FIELDS)
+        if new_file:
+            self.writer.writeheader()
+            self.log.flush()
+
+    def _apply(self, event):
+        """Apply one event to the in-memory state; returns True for a first check-in of the day."""
+        op, name, date = event['op'], event['name'], event['date']
+        if op == 'register':
+            self.state.enroll(name, date).update({
+                "Roll No": event['roll_no'], "Branch": event['branch'], "Mobile No": event['mobile_no'],
+            })
+        elif op == 'present':
+            return self.state.check_in(name, date, event['time'], event.get('camera') or "")
+        elif op == 'delete':
+            self.state.remove(name)
+        elif op == 'session':
+            self.state.add_session(date)
+        elif op == 'legacy':
+            # Same bookkeeping as the SQLite import: keep the old present/absent totals
+            person = self.state.enroll(name, "")
+            person.update({
+                "Roll No": event['roll_no'], "Branch": event['branch'], "Mobile No": event['mobile_no'],
+                "Date": date, "Absent Dates": event['absent_dates'],
+            })
+            person["Days Present"] = int(event['days_present'] or 0)
+            person["offset"] = len(self.state.sessions) - person["Days Present"] - int(event['days_absent'] or 0)
+            # The old Absent Dates already cover every session day logged so far
+            person["migrated_through"] = max(self.state.sessions, default="")
+            if date:
+                self.state.mark(name, date)
+                person["term_present"][term_for(date)] = 1
+                person["term_offset"][term_for(date)] = 0
+        return False
+
+    def _append(self, events):
+        """Append events to the log, flush them to disk and apply them."""
+        results = []
+        for event in events:
+            row = dict.fromkeys(self.FIELDS, '')
+            row.update(event)
+            self.writer.writerow(row)
+            results.append(self._apply(row))
+        self.log.flush()
+        os.fsync(self.log.fileno())
+        return results
+
+    def register_many(self, people):
+        with self.lock:
+            added = []
+            events = []
+            seen = set(self.state.people)
+            for name, roll_no, branch, mobile_no in people:
+                added.append(name not in seen)
+                if added[-1]:
+                    seen.add(name)
+                    events.append({'op': 'register', 'name': name, 'date': today(), 'time': now_time(),
+                                   'roll_no': roll_no, 'branch': branch, 'mobile_no': mobile_no})
+            if events:
+                self._append(events)
+            return added
+
+    def record_events(self, events):
+        with self.lock:
+            return self._append([
+                {'op': 'present', 'name': name, 'date': when.strftime('%Y-%m-%d'),
+                 'time': when.isoformat(timespec='milliseconds'), 'camera': camera or ""}
+                for name, when, camera in events
+            ])
+
+    def marked_on(self, date):
+        with self.lock:
+            return set(self.state.by_date.get(date, ()))
+
+    def delete(self, name):
+        with self.lock:
+            self._append([{'op': 'delete', 'name': name, 'date': today(), 'time': now_time()}])
+
+    def counters(self, name, term=None):
+        with self.lock:
+            return self.state.counters(name, term)
+
+    def total_present(self):
+        with self.lock:
+            return sum(person["Days Present"] for person in self.state.people.values())
+
+    def all_counters(self):
+        with self.lock:
+            return {name: self.state.counters(name) for name in self.state.people}
+
+    def history(self, name, start=None, end=None):
+        with self.lock:
+            person = self.state.people.get(name)
+            if person is None:
+                return []
+            return [
+                event for event in person["history"]
+                if (start is None or event[0] >= start) and (end is None or event[0] <= end)
+            ]
+
+    def students_frame(self):
+        with self.lock:
+            return pd.DataFrame(
+                [(name, person["Roll No"], person["Branch"], person["enrolled"], person["migrated_through"])
+                 for name, person in self.state.people.items()],
+                columns=["name", "roll_no", "branch", "enrolled_date", "migrated_through"],
+            )
+
+    def session_dates(self):
+        with self.lock:
+            return sorted(self.state.sessions)
+
+    def presence_frame(self, start=None, end=None):
+        with self.lock:
+            rows = [
+                (name, date) for name, date in self.state.present
+                if (start is None or date >= start) and (end is None or date <= end)
+            ]
+        return pd.DataFrame(sorted(rows, key=lambda row: row[1]), columns=["name", "date"])
+
+    def count_presence(self, before=None):
+        with self.lock:
+            return sum(1 for _, date in self.state.present if before is None or date < before)
+
+    def iter_events(self, start=None, end=None, chunk_size=100000):
+        with self.lock:
+            events = sorted(
+                (date, timestamp, name, camera)
+                for name, person in self.state.people.items()
+                for date, timestamp, camera in person["history"]
+                if (start is None or date >= start) and (end is None or date <= end)
+            )
+        for offset in range(0, len(events), chunk_size):
+            chunk = events[offset:offset + chunk_size]
+            yield pd.DataFrame(
+                [(name, date, timestamp, camera) for date, timestamp, name, camera in chunk],
+                columns=["name", "date", "timestamp", "camera"],
+            )
+
+    def records(self, absent_dates=False):
+        with self.lock:
+            return [self.state.record(name, absent_dates) for name in self.state.people]
+
+    def import_legacy(self, rows):
+        with self.lock:
+            # Session days first, so every legacy row sees the same session total
+            dates = sorted({row['last_date'] for row in rows if row['last_date']})
+            self._append([{'op': 'session', 'name': '', 'date': date} for date in dates] + [{
+                'op': 'legacy', 'name': row['name'], 'date': row['last_date'] or '',
+                'roll_no': row['roll_no'], 'branch': row['branch'], 'mobile_no': row['mobile_no'],
+                'days_present': row['days_present'], 'days_absent': row['days_absent'],
+                'absent_dates': row['absent_dates'],
+            } for row in rows])
+
+    def is_empty(self):
+        with self.lock:
+            return not self.state.people
+
+    def close(self):
+        with self.lock:
+            self.log.close()
+
+
+def migrate_legacy_csv(store, csv_path=LEGACY_CSV_FILE):
+    """One-time import of the old attendance.csv into an empty store; returns rows imported.
+
+    The CSV is renamed to *.migrated afterwards so it is never imported twice.
+    """
+    if not os.path.exists(csv_path) or not store.is_empty():
+        return 0
+    rows = read_legacy_csv(csv_path)
+    store.import_legacy(rows)
+    os.replace(csv_path, csv_path + '.migrated')
+    return len(rows)
+
+
+def open_store(backend=None, path=None, migrate=True):
+    """Open the configured attendance backend, migrating the legacy CSV on first use."""
+    backend = backend or config.ATTENDANCE_BACKEND
+    if backend == 'sqlite':
+        store = SQLiteAttendanceStore(path or SQLITE_FILE)
+    elif backend == 'eventlog':
+        store = EventLogAttendanceStore(path or EVENT_LOG_FILE)
+    else:
+        raise ValueError(f"Unknown attendance backend: {backend}")
+    if migrate:
+        migrate_legacy_csv(store)
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Attendance store maintenance.")
+    parser.add_argument("--backend", choices=["sqlite", "eventlog"], default=None)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="Write the records in the old attendance.csv format")
+    export_parser.add_argument("path", nargs="?", default=LEGACY_CSV_FILE)
+    migrate_parser = subparsers.add_parser("migrate", help="Import an old attendance.csv into an empty store")
+    migrate_parser.add_argument("path", nargs="?", default=LEGACY_CSV_FILE)
+    args = parser.parse_args()
+
+    store = open_store(args.backend, migrate=False)
+    try:
+        if args.command == "export":
+            store.export_csv(args.path)
+            print(f"Exported attendance to {args.path}")
+        else:
+            print(f"Imported {migrate_legacy_csv(store, args.path)} rows from {args.path}")
+    finally:
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
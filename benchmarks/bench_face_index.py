@@ -0,0 +1,53 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from face_index import FaceIndex, IVFFaceIndex
+from common import synthetic_gallery, synthetic_probes, timed
+
+
+def legacy_match(gallery, probe):
+    """What capture_face used to do: compare_faces followed by face_distance."""
+    matches = list(np.linalg.norm(gallery - probe, axis=1) <= 0.6)
+    distances = np.linalg.norm(gallery - probe, axis=1)
+    best = np.argmin(distances)
+    return best if matches[best] else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare exact and approximate face index latency and recall.")
+    parser.add_argument("--sizes", default="1000,10000,50000,100000")
+    parser.add_argument("--queries", type=int, default=256)
+    parser.add_argument("--n-probe", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'size':>8} {'legacy ms/q':>12} {'exact ms/q':>11} {'ivf ms/q':>9} {'ivf build s':>12} {'ivf recall@1':>13}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        gallery = synthetic_gallery(size)
+        probes, truth = synthetic_probes(gallery, args.queries)
+        gallery_list = list(gallery.astype(np.float64))
+
+        legacy_ms = timed(lambda: [legacy_match(np.array(gallery_list), p) for p in probes[:16]], 1)[0] / 16
+
+        exact = FaceIndex(gallery, range(size))
+        exact_ms = timed(lambda: exact.search(probes), args.repeat)[0] / args.queries
+
+        start = time.perf_counter()
+        ivf = IVFFaceIndex(gallery, range(size), n_probe=args.n_probe)
+        build_s = time.perf_counter() - start
+        ivf_ms = timed(lambda: ivf.search(probes), args.repeat)[0] / args.queries
+
+        _, exact_idx = exact.search(probes)
+        _, ivf_idx = ivf.search(probes)
+        recall = float(np.mean(exact_idx[:, 0] == ivf_idx[:, 0]))
+        assert np.mean(exact_idx[:, 0] == truth) > 0.99
+
+        print(f"{size:>8} {legacy_ms:>12.3f} {exact_ms:>11.3f} {ivf_ms:>9.3f} {build_s:>12.2f} {recall:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import argparse
+import os
+import sys
+import time
+import cv2
+import numpy as np
+from PyQt5.QtGui import QImage, QPixmap
+from PyQt5.QtWidgets import QApplication
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from frame_pipeline import FrameRenderer
+
+
+def legacy_render(frame, target_size):
+    """What update_frame used to do: full-size cvtColor, QImage over a temporary, new QPixmap."""
+    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    height, width, channel = frame.shape
+    qImg = QImage(frame.data, width, height, channel * width, QImage.Format_RGB888)
+    return QPixmap.fromImage(qImg)
+
+
+def renderer_render(renderer):
+    def render(frame, target_size):
+        return renderer.render(frame, target_size)
+    return render
+
+
+def load_frames(video, count, width, height):
+    """Frames from a video file, or synthetic noise frames of the given size."""
+    if video:
+        capture = cv2.VideoCapture(video)
+        frames = []
+        while len(frames) < count:
+            ret, frame = capture.read()
+            if not ret:
+                break
+            frames.append(frame)
+        capture.release()
+        if frames:
+            return frames
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, (height, width, 3), dtype=np.uint8) for _ in range(min(count, 30))]
+
+
+def measure(render, frames, target_size, count):
+    """Return (CPU ms per frame, wall ms per frame) over count renders."""
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    for i in range(count):
+        render(frames[i % len(frames)], target_size)
+    cpu = (time.process_time() - cpu_start) * 1000 / count
+    wall = (time.perf_counter() - wall_start) * 1000 / count
+    return cpu, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU cost per preview frame, old path vs FrameRenderer.")
+    parser.add_argument("--video", help="Video file to take frames from (default: synthetic frames)")
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--target", default="640x480", help="Preview label size")
+    args = parser.parse_args()
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QApplication(sys.argv)
+    target_size = tuple(int(v) for v in args.target.split("x"))
+    frames = load_frames(args.video, args.frames, args.width, args.height)
+
+    print(f"frame {frames[0].shape[1]}x{frames[0].shape[0]} -> preview {target_size[0]}x{target_size[1]}")
+    for label, render in (("legacy", legacy_render), ("renderer", renderer_render(FrameRenderer()))):
+        render(frames[0], target_size)  # warm up
+        cpu, wall = measure(render, frames, target_size, args.frames)
+        print(f"{label:>9}: {cpu:6.3f} ms CPU/frame, {wall:6.3f} ms wall/frame")
+    app.quit()
+
+
+if __name__ == "__main__":
+    main()
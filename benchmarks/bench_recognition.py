@@ -0,0 +1,265 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from attendance_cache import AttendanceCache
+from attendance_store import SQLiteAttendanceStore
+from encoding_store import INDEX_FILE, EncodingStore
+from face_index import build_index
+from common import synthetic_gallery, synthetic_probes
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import face_recognition
+except ImportError:
+    face_recognition = None
+
+# A stage counts as a regression when it gets this much slower than the baseline
+REGRESSION_FACTOR = 1.2
+
+
+def summarize(stage, size, samples_ms, peak_bytes, items=None):
+    """Percentiles, throughput and peak memory for one stage."""
+    samples = np.asarray(samples_ms)
+    total_s = samples.sum() / 1000
+    return {
+        'stage': stage,
+        'gallery_size': size,
+        'samples': len(samples),
+        'mean_ms': float(samples.mean()),
+        'p50_ms': float(np.percentile(samples, 50)),
+        'p90_ms': float(np.percentile(samples, 90)),
+        'p99_ms': float(np.percentile(samples, 99)),
+        'max_ms': float(samples.max()),
+        'throughput_per_s': (items or len(samples)) / total_s if total_s else None,
+        'peak_mb': peak_bytes / 2**20,
+    }
+
+
+def measure(fn, repeat):
+    """Call fn() repeat times; returns (per-call ms, peak traced bytes, last return value)."""
+    samples = []
+    tracemalloc.start()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            value = fn()
+            samples.append((time.perf_counter() - start) * 1000)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return samples, peak, value
+
+
+def make_dataset(root, gallery):
+    """Lay out an already-synced encoding store for the gallery, as the kiosk would find it.
+
+    The dataset images are empty placeholders; their stat data matches the
+    index, so sync() trusts every cached encoding just like on a normal start.
+    """
+    dataset_dir = os.path.join(root, 'dataset')
+    store_dir = os.path.join(root, 'encodings')
+    os.makedirs(dataset_dir)
+    os.makedirs(store_dir)
+    entries = {}
+    for row in range(len(gallery)):
+        image_file = f'person{row:06d}.jpg'
+        path = os.path.join(dataset_dir, image_file)
+        open(path, 'wb').close()
+        stat = os.stat(path)
+        entries[image_file] = {'name': image_file[:-4], 'mtime': stat.st_mtime, 'size': stat.st_size,
+                               'sha1': '', 'row': row}
+    np.save(os.path.join(store_dir, 'encodings.0.npy'), gallery)
+    with open(os.path.join(store_dir, INDEX_FILE), 'w') as f:
+        json.dump({'matrix': 'encodings.0.npy', 'entries': entries}, f)
+    return dataset_dir, store_dir
+
+
+def bench_gallery(size, args, results):
+    """Startup, matching and check-in stages at one gallery size."""
+    gallery = synthetic_gallery(size)
+    with tempfile.TemporaryDirectory() as root:
+        dataset_dir, store_dir = make_dataset(root, gallery)
+        store = EncodingStore(dataset_dir, store_dir)
+
+        # load_known_faces: stat every image, trust the cache, memory-map the matrix
+        samples, peak, (encodings, names) = measure(store.sync, args.repeat)
+        results.append(summarize('load_known_faces', size, samples, peak))
+
+        samples, peak, index = measure(lambda: build_index(encodings, names), args.repeat)
+        results.append(summarize('build_index', size, samples, peak))
+
+        # Hot reload of one enrollee: their rows swapped for a fresh set of samples
+        enrollee, _ = synthetic_probes(gallery, 5)
+        samples, peak, _ = measure(
+            lambda: index.replace_identities([names[0]], enrollee, [names[0]] * len(enrollee)), args.repeat)
+        results.append(summarize('index_update', size, samples, peak))
+
+        # Matching one face at a time, as capture_face does
+        probes, _ = synthetic_probes(gallery, args.queries)
+        probe_iter = iter(probes)
+        samples, peak, _ = measure(lambda: index.match(next(probe_iter)[None, :]), args.queries)
+        results.append(summarize('match', size, samples, peak))
+
+        # And a whole batch of faces in one call (a crowded frame)
+        samples, peak, _ = measure(lambda: index.match(probes), args.repeat)
+        results.append(summarize('match_batch', size, samples, peak, items=len(probes) * args.repeat))
+
+        # log_attendance against a store with the whole gallery enrolled
+        attendance_store = SQLiteAttendanceStore(os.path.join(root, 'attendance.db'))
+        attendance_store.register_many([(name, '', '', '') for name in names])
+        cache = AttendanceCache(attendance_store, journal_dir=root, flush_interval=3600)
+        people = iter(np.resize(np.asarray(names), args.queries))
+        samples, peak, _ = measure(lambda: cache.mark_present([next(people)]), args.queries)
+        results.append(summarize('log_attendance', size, samples, peak))
+
+        samples, peak, _ = measure(cache.flush, 1)
+        results.append(summarize('attendance_flush', size, samples, peak, items=args.queries))
+        cache.close()
+
+
+def load_frames(images, video, count):
+    """BGR frames from a folder of images or a video file."""
+    frames = []
+    if images:
+        for f in sorted(os.listdir(images)):
+            frame = cv2.imread(os.path.join(images, f))
+            if frame is not None:
+                frames.append(frame)
+            if len(frames) >= count:
+                break
+    elif video:
+        capture = cv2.VideoCapture(video)
+        while len(frames) < count:
+            ret, frame = capture.read()
+            if not ret:
+                break
+            frames.append(frame)
+        capture.release()
+    return frames
+
+
+def bench_encoding(frames, args, results):
+    """Colour conversion, detection and encoding on real frames (independent of gallery size)."""
+    if face_recognition is None:
+        print("face_recognition is not installed; skipping the encoding stages", file=sys.stderr)
+        return
+    model = args.model
+    rgb_frames = [cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) for frame in frames]
+    frame_iter = iter(range(len(frames) * args.repeat))
+
+    samples, peak, _ = measure(lambda: cv2.cvtColor(frames[next(frame_iter) % len(frames)], cv2.COLOR_BGR2RGB),
+                               len(frames) * args.repeat)
+    results.append(summarize('cvt_color', None, samples, peak))
+
+    locations = []
+    frame_iter = iter(range(len(frames)))
+    samples, peak, _ = measure(
+        lambda: locations.append(face_recognition.face_locations(rgb_frames[next(frame_iter)], model=model)),
+        len(frames))
+    results.append(summarize(f'face_locations_{model}', None, samples, peak))
+
+    faces = sum(len(found) for found in locations)
+    frame_iter = iter(range(len(frames)))
+
+    def encode():
+        i = next(frame_iter)
+        return face_recognition.face_encodings(rgb_frames[i], known_face_locations=locations[i])
+
+    samples, peak, _ = measure(encode, len(frames))
+    results.append(summarize('face_encodings', None, samples, peak, items=faces))
+
+
+def environment():
+    """What the numbers were measured on, so runs can be told apart later."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'commit': commit,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def compare(results, baseline_path, factor):
+    """Print stages whose p50 got slower than the baseline run by more than factor."""
+    with open(baseline_path, 'r') as f:
+        baseline = {(r['stage'], r['gallery_size']): r for r in json.load(f)['results']}
+    regressions = 0
+    for result in results:
+        old = baseline.get((result['stage'], result['gallery_size']))
+        if old is None or not old['p50_ms']:
+            continue
+        ratio = result['p50_ms'] / old['p50_ms']
+        if ratio > factor:
+            regressions += 1
+            print(f"REGRESSION {result['stage']} @ {result['gallery_size']}: "
+                  f"p50 {old['p50_ms']:.3f} -> {result['p50_ms']:.3f} ms ({ratio:.2f}x)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage latency, throughput and memory of the recognition path.")
+    parser.add_argument("--sizes", default="100,1000,10000,100000", help="Gallery sizes (synthetic encodings)")
+    parser.add_argument("--queries", type=int, default=500, help="Single-face matches and check-ins per size")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--images", help="Folder of sample images for the detection/encoding stages")
+    parser.add_argument("--video", help="Video file for the detection/encoding stages")
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--model", default="hog", choices=["hog", "cnn"])
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON from an earlier run to check for regressions")
+    parser.add_argument("--factor", type=float, default=REGRESSION_FACTOR)
+    args = parser.parse_args()
+
+    results = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        bench_gallery(size, args, results)
+
+    frames = load_frames(args.images, args.video, args.frames)
+    if frames:
+        bench_encoding(frames, args, results)
+
+    print(f"{'stage':<22} {'gallery':>8} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'per s':>10} {'peak MB':>8}")
+    for r in results:
+        throughput = f"{r['throughput_per_s']:.0f}" if r['throughput_per_s'] else '-'
+        print(f"{r['stage']:<22} {r['gallery_size'] or '-':>8} {r['p50_ms']:>9.3f} {r['p90_ms']:>9.3f} "
+              f"{r['p99_ms']:>9.3f} {throughput:>10} {r['peak_mb']:>8.1f}")
+
+    report = {'environment': environment(), 'results': results}
+    if resource is not None:
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        report['environment']['max_rss_mb'] = maxrss / (2**20 if sys.platform == 'darwin' else 2**10)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+
+    if args.baseline and compare(results, args.baseline, args.factor):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from attendance_store import SQLiteAttendanceStore, term_for
+from reporting import ReportEngine, to_dates, to_days
+from common import timed
+
+BRANCHES = ["CSE", "ECE", "ME", "CE", "EE", "IT"]
+
+
+def synthetic_history(store, students, years, rate, seed=0):
+    """Fill the store's tables directly: weekday sessions over some years, each student present with probability rate.
+
+    Bypasses record_events(), which would take far longer than the reports being measured.
+    Returns the number of (person, day) presences.
+    """
+    rng = np.random.default_rng(seed)
+    first = to_days(['2023-07-01'])[0]
+    days = np.arange(first, first + int(365 * years))
+    days = days[(days + 3) % 7 < 5]  # Monday to Friday
+    dates = to_dates(days)
+    people = [(f"student{i:05d}", f"R{i:05d}", BRANCHES[i % len(BRANCHES)], "", dates[0]) for i in range(students)]
+    with store.transaction() as cur:
+        cur.executemany(
+            "INSERT INTO students (name, roll_no, branch, mobile_no, enrolled_date) VALUES (?, ?, ?, ?, ?)", people)
+        cur.executemany("INSERT INTO sessions (date, term) VALUES (?, ?)", [(date, term_for(date)) for date in dates])
+        total = 0
+        for date in dates:
+            present = np.flatnonzero(rng.random(students) < rate)
+            cur.executemany(
+                "INSERT INTO attendance (name, date, time) VALUES (?, ?, '09:00:00')",
+                [(people[i][0], date) for i in present])
+            cur.executemany(
+                "INSERT INTO events (name, date, timestamp) VALUES (?, ?, ?)",
+                [(people[i][0], date, f"{date}T09:00:00.000") for i in present])
+            total += len(present)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency of the attendance reports over a synthetic history.")
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--years", type=float, default=3)
+    parser.add_argument("--rate", type=float, default=0.82, help="Chance a student is present on a session day")
+    parser.add_argument("--export", default="csv", choices=["csv", "parquet", "none"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        store = SQLiteAttendanceStore(os.path.join(root, 'attendance.db'))
+        start = time.perf_counter()
+        rows = synthetic_history(store, args.students, args.years, args.rate)
+        print(f"{rows} presences for {args.students} students generated in {time.perf_counter() - start:.1f} s")
+
+        engine = ReportEngine(store)
+        cold_ms, _ = timed(engine.refresh, 1)
+        warm_ms, _ = timed(engine.refresh)
+        print(f"{'refresh (cold)':<28} {cold_ms:>9.1f} ms")
+        print(f"{'refresh (warm)':<28} {warm_ms:>9.1f} ms")
+
+        reports = [
+            ('students, all history', lambda: engine.student_report()),
+            ('students, one term', lambda: engine.student_report('2024-07-01', '2024-12-31')),
+            ('students, one branch', lambda: engine.student_report(branch='CSE')),
+            ('one roll number', lambda: engine.student_report(roll_no='R00042')),
+            ('defaulters', lambda: engine.defaulters()),
+            ('branches', lambda: engine.branch_report()),
+            ('daily', lambda: engine.daily_report()),
+            ('weekly, one branch', lambda: engine.weekly_report(branch='ECE')),
+        ]
+        for label, fn in reports:
+            ms, report = timed(fn)
+            print(f"{label:<28} {ms:>9.1f} ms {len(report):>8} rows")
+
+        if args.export != "none":
+            path = os.path.join(root, f'events.{args.export}')
+            ms, written = timed(lambda: engine.export_events(path), 1)
+            print(f"{'export events (' + args.export + ')':<28} {ms:>9.1f} ms {written:>8} rows")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
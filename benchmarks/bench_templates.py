@@ -0,0 +1,76 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from face_index import FaceIndex, build_index
+
+
+def synthetic_people(count, looks, spread, seed=0):
+    """Per person a base encoding plus one offset per look (glasses, lighting, angle)."""
+    rng = np.random.default_rng(seed)
+    bases = rng.normal(0, 0.055, (count, 128)).astype(np.float32)
+    offsets = rng.normal(0, spread, (count, looks, 128)).astype(np.float32)
+    return bases, offsets
+
+
+def captures(bases, offsets, looks, noise, rng):
+    """One capture per person in the given looks (a look index per person)."""
+    people = np.arange(len(bases))
+    return bases + offsets[people, looks] + rng.normal(0, noise, bases.shape).astype(np.float32)
+
+
+def acceptance(index, probes, truth, impostors, tolerance):
+    """Share of probes matched to the right person, and of impostor probes accepted as anybody."""
+    matches = index.match(probes, tolerance=tolerance)
+    accepted = np.mean([name == person for (name, _), person in zip(matches, truth)])
+    false_accepts = np.mean([name is not None for name, _ in index.match(impostors, tolerance=tolerance)])
+    return float(accepted), float(false_accepts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="First-try acceptance of single-image versus multi-sample enrollment.")
+    parser.add_argument("--people", type=int, default=2000)
+    parser.add_argument("--samples", type=int, default=5, help="Enrollment captures per person")
+    parser.add_argument("--templates", type=int, default=3, help="Templates kept per person")
+    parser.add_argument("--looks", type=int, default=3, help="Distinct appearances per person")
+    parser.add_argument("--spread", type=float, default=0.03, help="Size of the per-look offsets")
+    parser.add_argument("--noise", type=float, default=0.02, help="Per-capture noise")
+    parser.add_argument("--tolerance", type=float, default=0.6)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    bases, offsets = synthetic_people(args.people, args.looks, args.spread)
+    names = list(range(args.people))
+
+    # Enrollment: one capture in the first look, or several cycling through the looks
+    single = captures(bases, offsets, np.zeros(args.people, dtype=int), args.noise, rng)
+    samples = np.concatenate([
+        captures(bases, offsets, np.full(args.people, i % args.looks), args.noise, rng)
+        for i in range(args.samples)
+    ])
+    sample_names = names * args.samples
+
+    # Check-ins: every person once in a random look, plus people who never enrolled
+    probes = captures(bases, offsets, rng.integers(0, args.looks, args.people), args.noise, rng)
+    impostor_bases, impostor_offsets = synthetic_people(args.people, args.looks, args.spread, seed=2)
+    impostors = captures(impostor_bases, impostor_offsets, np.zeros(args.people, dtype=int), args.noise, rng)
+
+    galleries = [
+        ('single image', FaceIndex(single, names)),
+        ('all samples', FaceIndex(samples, sample_names)),
+        ('templates', build_index(samples, sample_names, approximate=False, templates=args.templates)),
+    ]
+    print(f"{'gallery':<14} {'vectors':>8} {'accepted':>9} {'false accept':>13} {'ms/query':>9}")
+    for label, index in galleries:
+        accepted, false_accepts = acceptance(index, probes, names, impostors, args.tolerance)
+        start = time.perf_counter()
+        index.search(probes)
+        ms = (time.perf_counter() - start) * 1000 / len(probes)
+        print(f"{label:<14} {len(index):>8} {accepted:>9.3f} {false_accepts:>13.3f} {ms:>9.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import time
+import numpy as np
+
+
+def synthetic_gallery(size, seed=0):
+    """Random unit-ish 128-d encodings, roughly the spread of real dlib embeddings."""
+    rng = np.random.default_rng(seed)
+    return rng.normal(0, 0.09, (size, 128)).astype(np.float32)
+
+
+def synthetic_probes(gallery, count, noise=0.02, seed=1):
+    """Noisy copies of random gallery rows, with the row each probe came from."""
+    rng = np.random.default_rng(seed)
+    truth = rng.integers(0, len(gallery), count)
+    probes = gallery[truth] + rng.normal(0, noise, (count, 128)).astype(np.float32)
+    return probes, truth
+
+
+def timed(fn, repeat=5):
+    """Median wall time of fn() in milliseconds, and its last result."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return float(np.median(samples)), value
@@ -0,0 +1,231 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+import numpy as np
+import pandas as pd
+
+import config
+from attendance_store import open_store
+from encoding_store import EncodingStore, IMAGE_EXTENSIONS, valid_identity
+from face_detection import get_detector
+
+# Define paths
+DATASET_DIR = 'dataset'
+ENCODINGS_DIR = 'encodings'
+
+ROSTER_COLUMNS = ["Name", "Roll No", "Branch", "Mobile No"]
+
+
+def list_images(source):
+    """Return the image names in a folder or ZIP archive."""
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            names = archive.namelist()
+    else:
+        names = [
+            os.path.relpath(os.path.join(root, f), source)
+            for root, _, files in os.walk(source) for f in files
+        ]
+    return sorted(n for n in names if n.lower().endswith(IMAGE_EXTENSIONS) and not n.endswith('/'))
+
+
+# Open archives per process, so a worker parses the ZIP directory only once
+_archives = {}
+
+
+def read_image_bytes(source, image):
+    """Read one image from a folder or ZIP archive."""
+    if source in _archives or zipfile.is_zipfile(source):
+        if source not in _archives:
+            _archives[source] = zipfile.ZipFile(source)
+        return _archives[source].read(image)
+    with open(os.path.join(source, image), 'rb') as f:
+        return f.read()
+
+
+def encode_photo(source, image):
+    """Worker: return (status, encoding) for an ID photo; status is 'ok', 'no face' or 'N faces'.
+
+    Detection goes through the configured backend, like the kiosk and the
+    recognition service, but without the gate: it only exists to skip empty
+    camera frames, and a miss on an ID photo would reject it for good.
+    """
+    try:
+        frame = cv2.imdecode(np.frombuffer(read_image_bytes(source, image), np.uint8), cv2.IMREAD_COLOR)
+    except Exception as e:
+        return f"unreadable: {e}", None
+    if frame is None:
+        return "unreadable: not an image", None
+    locations, encodings = get_detector(config.DETECTION_MODEL, gate='none').detect_and_encode(frame)
+    if not locations:
+        return "no face", None
+    if len(locations) > 1:
+        return f"{len(locations)} faces", None
+    return "ok", encodings[0]
+
+
+def match_roster(roster, images):
+    """Pair roster rows with images.
+
+    An 'Image' column in the roster names the file explicitly; otherwise the
+    image whose file name (without extension) equals the Name or Roll No is used.
+    Returns (matches, rejected) where matches is a list of (row, image).
+    """
+    by_stem = {}
+    for image in images:
+        by_stem.setdefault(os.path.splitext(os.path.basename(image))[0].lower(), image)
+    by_path = {image.lower(): image for image in images}
+
+    matches, rejected = [], []
+    for row in roster:
+        if row.get("Image"):
+            image = by_path.get(row["Image"].lower()) or by_stem.get(os.path.splitext(row["Image"])[0].lower())
+        else:
+            image = by_stem.get(row["Name"].lower()) or by_stem.get(row["Roll No"].lower())
+        if image is None:
+            rejected.append((row["Name"], "", "no photo"))
+        else:
+            matches.append((row, image))
+    return matches, rejected
+
+
+def read_roster(path):
+    """Read the roster CSV into row dicts with string values.
+
+    Returns (rows, rejected); a Name that cannot be a dataset file name (a path
+    separator, '.' or '..') rejects only its own row.
+    """
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    missing = [column for column in ROSTER_COLUMNS if column not in df.columns]
+    if missing:
+        raise ValueError(f"Roster is missing columns: {', '.join(missing)}")
+    rows, rejected = [], []
+    for record in df.to_dict('records'):
+        row = {column: value.strip() for column, value in record.items()}
+        if not row["Name"]:
+            continue
+        if valid_identity(row["Name"]):
+            rows.append(row)
+        else:
+            rejected.append((row["Name"], "", "invalid name"))
+    return rows, rejected
+
+
+def save_photo(source, image, name, target_dir=DATASET_DIR):
+    """Write the photo to target_dir as <name>.jpg and return its file name."""
+    image_file = f"{name}.jpg"
+    data = read_image_bytes(source, image)
+    target = os.path.join(target_dir, image_file)
+    if image.lower().endswith(('.jpg', '.jpeg')):
+        with open(target, 'wb') as f:
+            f.write(data)
+    else:
+        pixels = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        cv2.imwrite(target, pixels)
+    return image_file
+
+
+def bulk_enroll(roster_path, source, workers=None, progress=None, dry_run=False):
+    """Enroll everybody in a roster CSV from a folder or ZIP of ID photos.
+
+    Faces are detected and encoded on a process pool. Photos with zero or several
+    faces are rejected. The accepted people are then written together: their
+    photos and encodings in one encoding-store write and their records in one
+    store transaction. Photos are staged outside the dataset and moved in while
+    the encoding store is locked, so a running gallery watcher never sees a
+    photo before its encoding. progress(done, total) is called as photos are encoded.
+    Returns (enrolled names, rejected (name, image, reason) tuples).
+    """
+    store = open_store()
+    try:
+        known = set(store.all_counters())
+        roster, rejected = read_roster(roster_path)
+        matches, unmatched = match_roster(roster, list_images(source))
+        rejected += unmatched
+
+        todo = []
+        for row, image in matches:
+            if row["Name"] in known:
+                rejected.append((row["Name"], image, "already registered"))
+            else:
+                known.add(row["Name"])
+                todo.append((row, image))
+
+        accepted = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(encode_photo, [source] * len(todo), [image for _, image in todo],
+                               chunksize=max(1, len(todo) // ((workers or os.cpu_count() or 1) * 8)))
+            for done, ((row, image), (status, encoding)) in enumerate(zip(todo, results), 1):
+                if status == "ok":
+                    accepted.append((row, image, encoding))
+                else:
+                    rejected.append((row["Name"], image, status))
+                if progress:
+                    progress(done, len(todo))
+
+        if dry_run or not accepted:
+            return [row["Name"] for row, _, _ in accepted], rejected
+
+        os.makedirs(DATASET_DIR, exist_ok=True)
+        # Next to the dataset, so moving a photo in is a rename on the same disk
+        staging = tempfile.mkdtemp(prefix='.enroll-', dir=os.path.dirname(os.path.abspath(DATASET_DIR)))
+        encoding_store = EncodingStore(DATASET_DIR, ENCODINGS_DIR)
+        saved = []
+        moved = []
+        try:
+            for row, image, encoding in accepted:
+                saved.append((save_photo(source, image, row["Name"], staging), encoding))
+            with encoding_store.lock:
+                encoding_store.add(saved, image_dir=staging)
+                for image_file, _ in saved:
+                    os.replace(os.path.join(staging, image_file), os.path.join(DATASET_DIR, image_file))
+                    moved.append(image_file)
+            store.register_many([tuple(row[column] for column in ROSTER_COLUMNS) for row, _, _ in accepted])
+        except Exception:
+            # Undo the photos so the dataset matches the store again
+            for image_file in moved:
+                if os.path.exists(os.path.join(DATASET_DIR, image_file)):
+                    os.remove(os.path.join(DATASET_DIR, image_file))
+            encoding_store.sync()
+            raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        return [row["Name"] for row, _, _ in accepted], rejected
+    finally:
+        store.close()
+
+
+def write_report(path, enrolled, rejected):
+    """Write one line per roster entry with its outcome."""
+    rows = [(name, "", "enrolled") for name in enrolled] + rejected
+    pd.DataFrame(rows, columns=["Name", "Image", "Result"]).to_csv(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Enroll a whole class from a roster CSV and a folder or ZIP of photos.")
+    parser.add_argument("roster", help="CSV with Name, Roll No, Branch, Mobile No and optionally Image columns")
+    parser.add_argument("source", help="Folder or ZIP archive of ID photos")
+    parser.add_argument("--workers", type=int, default=None, help="Encoding processes (default: all cores)")
+    parser.add_argument("--report", help="Write a CSV with the outcome for every roster entry")
+    parser.add_argument("--dry-run", action="store_true", help="Check the photos without enrolling anybody")
+    args = parser.parse_args()
+
+    def progress(done, total):
+        print(f"\rEncoded {done}/{total}", end="", file=sys.stderr, flush=True)
+
+    enrolled, rejected = bulk_enroll(args.roster, args.source, args.workers, progress, args.dry_run)
+    print(file=sys.stderr)
+    print(f"{'Accepted' if args.dry_run else 'Enrolled'}: {len(enrolled)}, rejected: {len(rejected)}")
+    for name, image, reason in rejected:
+        print(f"  {name} ({image or '-'}): {reason}")
+    if args.report:
+        write_report(args.report, enrolled, rejected)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+import threading
+import time
+import cv2
+
+import metrics
+
+
+def parse_source(source):
+    """Turn '0'/'1' into a camera index; anything else is a file path or stream URL."""
+    if isinstance(source, str) and source.strip().isdigit():
+        return int(source)
+    return source
+
+
+def parse_cameras(spec):
+    """Split a camera list like "north=0,south=rtsp://host/stream" into (camera_id, source) pairs.
+
+    Unnamed entries get cam0, cam1, ... by position.
+    """
+    cameras = []
+    for position, item in enumerate(part.strip() for part in spec.split(',')):
+        if not item:
+            continue
+        name, sep, source = item.partition('=')
+        # Only a plain word before '=' is a name; URLs can carry '=' in their query
+        if sep and name and not any(c in name for c in ':/?&'):
+            cameras.append((name.strip(), source.strip()))
+        else:
+            cameras.append((f'cam{position}', item))
+    return cameras
+
+
+class CameraGrabber:
+    """Reads frames on a background thread and keeps only the newest one.
+
+    The grabber thread is the only caller of VideoCapture.read(), so a stalled
+    driver never blocks the GUI. Frames go into a single slot (one tuple
+    assignment, no queue); a consumer that falls behind simply skips frames,
+    which are counted as dropped. Camera indexes, video files and RTSP/HTTP
+    URLs all work the same way. Files are paced at their own frame rate so a
+    recording behaves like a live camera, and can loop for benchmarks.
+    """
+
+    def __init__(self, source=0, realtime=None, loop=False, name=None):
+        self.source = parse_source(source)
+        self.name = name if name is not None else str(source)
+        self.is_file = isinstance(self.source, str) and '://' not in self.source
+        self.realtime = self.is_file if realtime is None else realtime
+        self.loop = loop
+        self.capture = None
+        self.thread = None
+        self._running = False
+        self.ended = False
+
+        # (frame, sequence number, grab time); replaced as a whole by the grabber
+        self._slot = (None, 0, 0.0)
+        self._delivered_seq = 0
+        self.grabbed = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.failures = 0
+        self._latency_total = 0.0
+        self._started_at = 0.0
+
+    def start(self):
+        """Open the source and start grabbing; returns False if it cannot be opened."""
+        self.capture = cv2.VideoCapture(self.source)
+        if not self.capture.isOpened():
+            return False
+        fps = self.capture.get(cv2.CAP_PROP_FPS)
+        self.frame_interval = 1.0 / fps if self.realtime and fps and fps > 0 else 0.0
+        self._running = True
+        self._started_at = time.monotonic()
+        self.thread = threading.Thread(target=self._grab_loop, name=f'camera-{self.name}', daemon=True)
+        self.thread.start()
+        return True
+
+    def isOpened(self):
+        return self.capture is not None and self.capture.isOpened() and not self.ended
+
+    def _grab_loop(self):
+        next_due = time.monotonic()
+        while self._running:
+            with metrics.span('camera_read'):
+                ret, frame = self.capture.read()
+            if not ret:
+                if self.is_file and self.loop:
+                    self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                if self.is_file:
+                    self.ended = True
+                    break
+                # Live sources can hiccup; back off briefly instead of spinning
+                self.failures += 1
+                time.sleep(0.01)
+                continue
+
+            if self.frame_interval:
+                next_due += self.frame_interval
+                delay = next_due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_due = time.monotonic()
+
+            self.grabbed += 1
+            self._slot = (frame, self.grabbed, time.monotonic())
+
+    def latest(self):
+        """Return (frame, sequence number) of the newest frame; frame is None before the first one.
+
+        The sequence number only changes when a new frame arrives, so callers can
+        skip work when it matches the last one they saw.
+        """
+        frame, seq, grabbed_at = self._slot
+        if seq > self._delivered_seq:
+            self.dropped += seq - self._delivered_seq - 1
+            self._delivered_seq = seq
+            self.delivered += 1
+            self._latency_total += time.monotonic() - grabbed_at
+        return frame, seq
+
+    def read(self):
+        """VideoCapture-style (ret, frame) for the newest frame."""
+        frame, _ = self.latest()
+        return frame is not None, frame
+
+    def stats(self):
+        """Return grab rate, dropped frames and mean grab-to-delivery latency."""
+        elapsed = max(time.monotonic() - self._started_at, 1e-6)
+        return {
+            'camera': self.name,
+            'grab_fps': self.grabbed / elapsed,
+            'grabbed': self.grabbed,
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'failures': self.failures,
+            'latency_ms': 1000 * self._latency_total / self.delivered if self.delivered else 0.0,
+        }
+
+    def release(self):
+        """Stop the grabber thread and release the source."""
+        self._running = False
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+        if self.capture is not None:
+            self.capture.release()
@@ -0,0 +1,86 @@
+import os
+
+# Recognition settings, overridable through environment variables
+DETECTION_MODEL = os.environ.get('ATTENDANCE_DETECTION_MODEL', 'hog')  # 'hog', 'cnn', 'haar' or 'dnn'
+MATCH_TOLERANCE = float(os.environ.get('ATTENDANCE_MATCH_TOLERANCE', '0.6'))
+
+# Background recognition pool: 'process' runs dlib on every core, 'thread' avoids
+# pickling frames but only helps as far as dlib releases the GIL
+RECOGNITION_EXECUTOR = os.environ.get('ATTENDANCE_RECOGNITION_EXECUTOR', 'process')
+RECOGNITION_WORKERS = int(os.environ.get('ATTENDANCE_RECOGNITION_WORKERS', str(max(1, (os.cpu_count() or 2) - 1))))
+MAX_PENDING_FRAMES = int(os.environ.get('ATTENDANCE_MAX_PENDING_FRAMES', str(RECOGNITION_WORKERS * 2)))
+
+# Hands-free mode: recognize every Nth preview frame on a downscaled copy and
+# ignore an identity for a while after it has been processed
+AUTO_MODE = os.environ.get('ATTENDANCE_AUTO_MODE', '0') == '1'
+RECOGNIZE_EVERY_N_FRAMES = int(os.environ.get('ATTENDANCE_RECOGNIZE_EVERY_N_FRAMES', '3'))
+DETECTION_SCALE = float(os.environ.get('ATTENDANCE_DETECTION_SCALE', '0.25'))
+IDENTITY_COOLDOWN_SECONDS = float(os.environ.get('ATTENDANCE_IDENTITY_COOLDOWN_SECONDS', '60'))
+
+# Attendance storage backend: 'sqlite' or 'eventlog' (append-only CSV log)
+ATTENDANCE_BACKEND = os.environ.get('ATTENDANCE_BACKEND', 'sqlite')
+
+# Months in which a new term starts, used for per-term attendance counters
+TERM_START_MONTHS = sorted(int(m) for m in os.environ.get('ATTENDANCE_TERM_START_MONTHS', '1,7').split(','))
+
+# Seconds between write-behind flushes of the in-memory attendance cache
+ATTENDANCE_FLUSH_SECONDS = float(os.environ.get('ATTENDANCE_FLUSH_SECONDS', '5'))
+
+# Camera index, video file or stream URL for the kiosk
+CAMERA_SOURCE = os.environ.get('ATTENDANCE_CAMERA', '0')
+
+# Several cameras driven by one kiosk process, comma separated, each optionally
+# named: "north=0,south=rtsp://10.0.0.7/stream". Defaults to the single camera above.
+CAMERAS = os.environ.get('ATTENDANCE_CAMERAS', CAMERA_SOURCE)
+
+# Local recognition service; when ATTENDANCE_SERVICE_URL is set the kiosk sends
+# frames and check-ins there instead of loading the encodings itself
+SERVICE_HOST = os.environ.get('ATTENDANCE_SERVICE_HOST', '127.0.0.1')
+SERVICE_PORT = int(os.environ.get('ATTENDANCE_SERVICE_PORT', '8765'))
+SERVICE_URL = os.environ.get('ATTENDANCE_SERVICE_URL', '')
+
+# Stage timing instrumentation; METRICS_FILE gets a periodic dump, as JSON if
+# it ends in .json and Prometheus text otherwise (empty disables the dump)
+METRICS_ENABLED = os.environ.get('ATTENDANCE_METRICS', '1') == '1'
+METRICS_FILE = os.environ.get('ATTENDANCE_METRICS_FILE', '')
+METRICS_DUMP_SECONDS = float(os.environ.get('ATTENDANCE_METRICS_DUMP_SECONDS', '10'))
+METRICS_OVERLAY = os.environ.get('ATTENDANCE_METRICS_OVERLAY', '0') == '1'
+
+# Cheap first-stage detector ('haar', 'dnn' or 'none') run on a copy of the frame
+# scaled to DETECTION_GATE_WIDTH pixels; frames where it finds nobody are never
+# colour converted, HOG/CNN scanned or encoded
+DETECTION_GATE = os.environ.get('ATTENDANCE_DETECTION_GATE', 'haar')
+DETECTION_GATE_WIDTH = int(os.environ.get('ATTENDANCE_DETECTION_GATE_WIDTH', '320'))
+
+# Model files for the OpenCV detectors; an empty HAAR_CASCADE uses the one bundled with OpenCV
+HAAR_CASCADE = os.environ.get('ATTENDANCE_HAAR_CASCADE', '')
+DNN_PROTO = os.environ.get('ATTENDANCE_DNN_PROTO', os.path.join('models', 'deploy.prototxt'))
+DNN_MODEL = os.environ.get('ATTENDANCE_DNN_MODEL', os.path.join('models', 'res10_300x300_ssd_iter_140000.caffemodel'))
+DNN_CONFIDENCE = float(os.environ.get('ATTENDANCE_DNN_CONFIDENCE', '0.5'))
+
+# Hands-free face tracking: a face keeps its identity across frames once it has
+# matched the same person TRACK_CONFIRMATIONS times, and is only re-encoded every
+# TRACK_REVERIFY_SECONDS; tracks not seen for TRACK_MAX_AGE_SECONDS are dropped
+TRACKING = os.environ.get('ATTENDANCE_TRACKING', '1') == '1'
+TRACK_IOU = float(os.environ.get('ATTENDANCE_TRACK_IOU', '0.3'))
+TRACK_CONFIRMATIONS = int(os.environ.get('ATTENDANCE_TRACK_CONFIRMATIONS', '2'))
+TRACK_REVERIFY_SECONDS = float(os.environ.get('ATTENDANCE_TRACK_REVERIFY_SECONDS', '2.0'))
+TRACK_MAX_AGE_SECONDS = float(os.environ.get('ATTENDANCE_TRACK_MAX_AGE_SECONDS', '1.0'))
+
+# Enrollment captures ENROLL_SAMPLES frames, ENROLL_SAMPLE_INTERVAL seconds apart,
+# into dataset/<name>/; the index keeps at most TEMPLATES_PER_IDENTITY vectors
+# per person (their centroid plus the most distinct samples)
+ENROLL_SAMPLES = int(os.environ.get('ATTENDANCE_ENROLL_SAMPLES', '5'))
+ENROLL_SAMPLE_INTERVAL = float(os.environ.get('ATTENDANCE_ENROLL_SAMPLE_INTERVAL', '0.4'))
+TEMPLATES_PER_IDENTITY = int(os.environ.get('ATTENDANCE_TEMPLATES_PER_IDENTITY', '3'))
+
+# Watch the dataset while running and apply enrollments and deletions to the
+# live index; polled every GALLERY_POLL_SECONDS, or on file events when the
+# optional watchdog package is installed
+GALLERY_WATCH = os.environ.get('ATTENDANCE_GALLERY_WATCH', '1') == '1'
+GALLERY_POLL_SECONDS = float(os.environ.get('ATTENDANCE_GALLERY_POLL_SECONDS', '0.5'))
+
+# Reports: people below DEFAULTER_THRESHOLD percent attendance are defaulters;
+# exports of the check-in history are written REPORT_CHUNK_ROWS rows at a time
+DEFAULTER_THRESHOLD = float(os.environ.get('ATTENDANCE_DEFAULTER_THRESHOLD', '75'))
+REPORT_CHUNK_ROWS = int(os.environ.get('ATTENDANCE_REPORT_CHUNK_ROWS', '100000'))
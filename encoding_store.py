@@ -0,0 +1,303 @@
+import hashlib
+import json
+import os
+import threading
+import numpy as np
+
+from file_lock import lock_file, unlock_file
+
+ENCODING_SIZE = 128
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+INDEX_FILE = 'index.json'
+LOCK_FILE = 'store.lock'
+
+
+def file_digest(path):
+    """Return the SHA-1 hex digest of a file's contents."""
+    sha = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def identity_name(image_file):
+    """Name of the person in a dataset image: the folder for <name>/<sample>.jpg, else the file stem."""
+    folder, _, file_name = image_file.rpartition('/')
+    return folder if folder else os.path.splitext(file_name)[0]
+
+
+def valid_identity(name):
+    """Whether a person's name can safely be used as a file or folder name under the dataset."""
+    if not name or name in ('.', '..'):
+        return False
+    return os.sep not in name and not (os.altsep and os.altsep in name)
+
+
+def encode_image(image_path):
+    """Return the first face encoding found in an image, or None if there is no face."""
+    # Imported here so the cache can be read and written without dlib installed
+    import face_recognition
+    image = face_recognition.load_image_file(image_path)
+    encodings = face_recognition.face_encodings(image)
+    return encodings[0] if encodings else None
+
+
+class StoreLock:
+    """Reentrant lock on a store directory, held against other threads and other processes.
+
+    Threads wait on an RLock; the first acquisition in a thread then takes an
+    exclusive OS lock on the lock file, so a kiosk, the admin panel and a bulk
+    import never write the same store at once.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.thread_lock = threading.RLock()
+        self.depth = 0
+        self.file = None
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        try:
+            if self.depth == 0:
+                self.file = open(self.path, 'a+b')
+                try:
+                    lock_file(self.file)
+                except BaseException:
+                    self.file.close()
+                    raise
+            self.depth += 1
+        except BaseException:
+            self.thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.depth -= 1
+        if self.depth == 0:
+            unlock_file(self.file)
+            self.file.close()
+            self.file = None
+        self.thread_lock.release()
+
+
+# One StoreLock per lock file, shared by every EncodingStore in the process
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def store_lock(store_dir):
+    """Return the process-wide StoreLock for a store directory."""
+    path = os.path.abspath(os.path.join(store_dir, LOCK_FILE))
+    with _locks_guard:
+        if path not in _locks:
+            _locks[path] = StoreLock(path)
+        return _locks[path]
+
+
+class EncodingStore:
+    """On-disk cache of face encodings for the images in the dataset directory.
+
+    Encodings are kept in a single (N, 128) float32 .npy matrix that is memory-mapped
+    on load, next to a JSON index keyed by image path with the mtime, size and
+    content hash of each file. Only new or changed images are re-encoded.
+
+    A person is either one image, dataset/<name>.jpg, or a folder of samples,
+    dataset/<name>/*.jpg; every sample gets its own row under the same name.
+
+    sync(), add() and the writes behind them hold self.lock, which is shared
+    with every other store on the same directory, in this process or another.
+    """
+
+    def __init__(self, dataset_dir, store_dir):
+        self.dataset_dir = dataset_dir
+        self.store_dir = store_dir
+        self.index_path = os.path.join(store_dir, INDEX_FILE)
+        os.makedirs(store_dir, exist_ok=True)
+        self.lock = store_lock(store_dir)
+
+    def _read_index(self):
+        """Read the index file, returning (entries, matrix file name)."""
+        if not os.path.exists(self.index_path):
+            return {}, None
+        try:
+            with open(self.index_path, 'r') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            # A corrupt index just means everything gets re-encoded once
+            return {}, None
+        return index.get('entries', {}), index.get('matrix')
+
+    def _load_matrix(self, matrix_file, rows):
+        """Memory-map the encoding matrix, or return an empty one if it is missing."""
+        if not matrix_file or rows == 0:
+            return np.empty((0, ENCODING_SIZE), dtype=np.float32)
+        matrix_path = os.path.join(self.store_dir, matrix_file)
+        if not os.path.exists(matrix_path):
+            return None
+        matrix = np.load(matrix_path, mmap_mode='r')
+        if matrix.shape != (rows, ENCODING_SIZE):
+            return None
+        return matrix
+
+    def load(self):
+        """Load the cached encodings without touching the dataset directory."""
+        entries, matrix_file = self._read_index()
+        rows = sum(1 for entry in entries.values() if entry['row'] is not None)
+        matrix = self._load_matrix(matrix_file, rows)
+        if matrix is None:
+            return {}, np.empty((0, ENCODING_SIZE), dtype=np.float32)
+        return entries, matrix
+
+    def _scan(self):
+        """List the image files in the dataset directory and its per-person folders."""
+        images = []
+        for entry in os.scandir(self.dataset_dir):
+            if entry.is_dir():
+                images.extend(
+                    f"{entry.name}/{f}" for f in os.listdir(entry.path)
+                    if f.lower().endswith(IMAGE_EXTENSIONS)
+                )
+            elif entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                images.append(entry.name)
+        return sorted(images)
+
+    def sync(self):
+        """Bring the cache up to date with the dataset and return (encodings, names)."""
+        with self.lock:
+            return self._sync()
+
+    def _sync(self):
+        entries, matrix = self.load()
+        fresh = {}
+        new_encodings = {}
+        changed = False
+
+        for image_file in self._scan():
+            image_path = os.path.join(self.dataset_dir, image_file)
+            stat = os.stat(image_path)
+            entry = entries.get(image_file)
+
+            # Unchanged file: trust the cached encoding
+            if entry and entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+                fresh[image_file] = entry
+                continue
+
+            # Touched but identical contents: only refresh the metadata
+            digest = file_digest(image_path)
+            if entry and entry['sha1'] == digest:
+                fresh[image_file] = dict(entry, mtime=stat.st_mtime, size=stat.st_size)
+                changed = True
+                continue
+
+            encoding = encode_image(image_path)
+            fresh[image_file] = {
+                'name': identity_name(image_file),
+                'mtime': stat.st_mtime,
+                'size': stat.st_size,
+                'sha1': digest,
+                'row': None,
+            }
+            if encoding is not None:
+                new_encodings[image_file] = encoding
+            changed = True
+
+        # Images removed from the dataset are dropped from the cache
+        if set(entries) - set(fresh):
+            changed = True
+
+        if changed:
+            entries, matrix = self._write(fresh, new_encodings, matrix)
+
+        return matrix, self.names(entries)
+
+    def add(self, images, image_dir=None):
+        """Record (image_file, encoding) pairs for images already written to the dataset.
+
+        Used when the encodings were computed elsewhere (bulk enrollment), so the
+        whole batch lands in a single matrix/index write. image_dir reads the
+        files from a staging folder instead; the caller then moves them into
+        the dataset, unchanged, before releasing self.lock.
+        """
+        with self.lock:
+            return self._add(images, image_dir or self.dataset_dir)
+
+    def _add(self, images, image_dir):
+        entries, matrix = self.load()
+        new_encodings = {}
+        for image_file, encoding in images:
+            image_path = os.path.join(image_dir, image_file)
+            stat = os.stat(image_path)
+            entries[image_file] = {
+                'name': identity_name(image_file),
+                'mtime': stat.st_mtime,
+                'size': stat.st_size,
+                'sha1': file_digest(image_path),
+                'row': entries.get(image_file, {}).get('row'),
+            }
+            new_encodings[image_file] = encoding
+        entries, matrix = self._write(entries, new_encodings, matrix)
+        return matrix, self.names(entries)
+
+    def _write(self, entries, new_encodings, old_matrix):
+        """Write a new matrix/index generation and return (entries, matrix)."""
+        with self.lock:
+            return self._write_generation(entries, new_encodings, old_matrix)
+
+    def _write_generation(self, entries, new_encodings, old_matrix):
+        rows = []
+        for image_file in sorted(entries):
+            entry = entries[image_file]
+            if image_file in new_encodings:
+                rows.append(new_encodings[image_file])
+            elif entry['row'] is not None:
+                rows.append(old_matrix[entry['row']])
+            else:
+                continue
+            entry['row'] = len(rows) - 1
+
+        if rows:
+            matrix = np.asarray(rows, dtype=np.float32)
+        else:
+            matrix = np.empty((0, ENCODING_SIZE), dtype=np.float32)
+
+        _, old_matrix_file = self._read_index()
+        generation = 0
+        if old_matrix_file:
+            generation = int(old_matrix_file.split('.')[1]) + 1
+        matrix_file = f'encodings.{generation}.npy'
+
+        # Matrix first, then the index that points at it, so a crash never
+        # leaves an index referring to a half-written matrix
+        tmp_path = os.path.join(self.store_dir, matrix_file + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.save(f, matrix)
+        os.replace(tmp_path, os.path.join(self.store_dir, matrix_file))
+
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'matrix': matrix_file, 'entries': entries}, f)
+        os.replace(tmp_path, self.index_path)
+
+        self._remove_stale(matrix_file)
+        return entries, self._load_matrix(matrix_file, len(rows))
+
+    def _remove_stale(self, current):
+        """Delete matrix files from older generations."""
+        for f in os.listdir(self.store_dir):
+            if f.startswith('encodings.') and f != current:
+                try:
+                    os.remove(os.path.join(self.store_dir, f))
+                except OSError:
+                    # Still memory-mapped somewhere (Windows); retry on the next sync
+                    pass
+
+    @staticmethod
+    def names(entries):
+        """Return the identity names in matrix row order."""
+        ordered = sorted(
+            (entry['row'], entry['name']) for entry in entries.values()
+            if entry['row'] is not None
+        )
+        return [name for _, name in ordered]
@@ -0,0 +1,228 @@
+import os
+import time
+import warnings
+import cv2
+import face_recognition
+import numpy as np
+
+import config
+
+# Face boxes are (top, right, bottom, left) in full-frame pixels, the
+# face_recognition convention, whichever backend found them.
+
+BACKENDS = ('hog', 'cnn', 'haar', 'dnn')
+
+# Gate hits are grown by this fraction of their size on every side before the
+# main detector looks at them, so a loose cascade box still contains the face
+ROI_MARGIN = 0.5
+
+# Above this share of the frame the ROIs are not worth it; detect on the whole frame
+ROI_MAX_AREA = 0.5
+
+
+class HaarDetector:
+    """OpenCV Viola-Jones cascade on a grayscale image: about a millisecond on a small frame."""
+
+    def __init__(self, path=config.HAAR_CASCADE, min_neighbors=4):
+        if not hasattr(cv2, 'CascadeClassifier'):
+            # OpenCV 5 moved the cascades out of the main package
+            raise RuntimeError("This OpenCV build has no CascadeClassifier")
+        if not path and hasattr(cv2, 'data'):
+            path = os.path.join(cv2.data.haarcascades, 'haarcascade_frontalface_default.xml')
+        self.cascade = cv2.CascadeClassifier(path)
+        if self.cascade.empty():
+            raise FileNotFoundError(f"Haar cascade not found: {path}")
+        self.min_neighbors = min_neighbors
+
+    def detect(self, frame, scale=1.0):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if scale < 1.0:
+            gray = cv2.resize(gray, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        rects = self.cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=self.min_neighbors,
+                                              minSize=(20, 20))
+        return _to_locations(rects, scale, frame.shape)
+
+
+class DNNDetector:
+    """OpenCV's ResNet-10 SSD face detector (Caffe model files from config)."""
+
+    def __init__(self, proto=config.DNN_PROTO, model=config.DNN_MODEL, confidence=config.DNN_CONFIDENCE):
+        for path in (proto, model):
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"DNN face model file not found: {path}")
+        self.net = cv2.dnn.readNetFromCaffe(proto, model)
+        self.confidence = confidence
+
+    def detect(self, frame, scale=1.0):
+        height, width = frame.shape[:2]
+        blob = cv2.dnn.blobFromImage(frame, 1.0, (300, 300), (104.0, 177.0, 123.0))
+        self.net.setInput(blob)
+        detections = self.net.forward()[0, 0]
+        rects = []
+        for _, _, confidence, x1, y1, x2, y2 in detections:
+            if confidence >= self.confidence:
+                left, top = int(x1 * width), int(y1 * height)
+                rects.append((left, top, int(x2 * width) - left, int(y2 * height) - top))
+        return _to_locations(rects, 1.0, frame.shape)
+
+
+def _to_locations(rects, scale, shape):
+    """Map OpenCV (x, y, w, h) boxes found at scale back to full-frame (top, right, bottom, left)."""
+    height, width = shape[:2]
+    return [
+        (max(0, int(y / scale)), min(width, int((x + w) / scale)),
+         min(height, int((y + h) / scale)), max(0, int(x / scale)))
+        for x, y, w, h in rects
+    ]
+
+
+def _dlib_detect(image, model, scale):
+    """face_recognition's HOG or CNN detector on an RGB image, optionally downscaled."""
+    if scale >= 1.0:
+        return face_recognition.face_locations(image, model=model)
+    small = cv2.resize(image, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    height, width = image.shape[:2]
+    return [
+        (max(0, int(top / scale)), min(width, int(right / scale)),
+         min(height, int(bottom / scale)), max(0, int(left / scale)))
+        for top, right, bottom, left in face_recognition.face_locations(small, model=model)
+    ]
+
+
+def expand(location, shape, margin=ROI_MARGIN):
+    """Grow a box by margin of its size on each side, clipped to the frame."""
+    top, right, bottom, left = location
+    height, width = shape[:2]
+    dy, dx = int((bottom - top) * margin), int((right - left) * margin)
+    return max(0, top - dy), min(width, right + dx), min(height, bottom + dy), max(0, left - dx)
+
+
+def iou(a, b):
+    """Intersection over union of two (top, right, bottom, left) boxes."""
+    inter = max(0, min(a[2], b[2]) - max(a[0], b[0])) * max(0, min(a[1], b[1]) - max(a[3], b[3]))
+    union = (a[2] - a[0]) * (a[1] - a[3]) + (b[2] - b[0]) * (b[1] - b[3]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _merge(locations, threshold=0.3):
+    """Drop boxes overlapping an earlier one by more than threshold IoU (overlapping ROIs find a face twice)."""
+    kept = []
+    for box in locations:
+        if all(iou(box, other) <= threshold for other in kept):
+            kept.append(box)
+    return kept
+
+
+class FaceDetector:
+    """Configurable two-stage face detector.
+
+    The gate is a cheap cascade run on a small grayscale copy of the frame. When
+    it finds nothing the frame is dropped before any colour conversion, HOG/CNN
+    pass or encoding, so an empty entrance costs about a millisecond per frame.
+    When it does find something, the main backend only looks at the regions
+    around the gate hits, at full resolution, unless those cover most of the
+    frame anyway.
+
+    A gate that cannot be loaded (no cascade in this OpenCV build) is
+    switched off with a RuntimeWarning rather than stopping recognition; every
+    frame then goes through the full detector. Set the gate to 'none' to run
+    that way on purpose.
+    """
+
+    def __init__(self, backend=config.DETECTION_MODEL, gate=config.DETECTION_GATE,
+                 gate_width=config.DETECTION_GATE_WIDTH):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown detection backend: {backend} (expected one of {', '.join(BACKENDS)})")
+        self.backend = backend
+        self.detector = HaarDetector() if backend == 'haar' else DNNDetector() if backend == 'dnn' else None
+        self.gate = None
+        # A gate of the same kind as the main detector would only repeat its work
+        if gate and gate != 'none' and gate != backend:
+            try:
+                self.gate = HaarDetector() if gate == 'haar' else DNNDetector() if gate == 'dnn' else None
+            except (FileNotFoundError, RuntimeError) as e:
+                warnings.warn(
+                    f"Detection gate '{gate}' unavailable, every frame goes through the full {backend} detector: {e}. "
+                    f"Set ATTENDANCE_DETECTION_GATE=none to silence this, or pick a gate this build supports.",
+                    RuntimeWarning, stacklevel=2,
+                )
+        self.gate_width = gate_width
+
+    def gate_regions(self, frame):
+        """Rough face boxes from the cheap gate, or None when there is no gate."""
+        if self.gate is None:
+            return None
+        scale = min(1.0, self.gate_width / frame.shape[1])
+        return self.gate.detect(frame, scale)
+
+    def detect(self, frame, image=None, scale=1.0, regions=None):
+        """Return face locations in a BGR frame.
+
+        image is the RGB copy of the frame when the caller already has one (the
+        dlib backends need it). regions are gate hits to restrict the search to.
+        """
+        if self.detector is not None:
+            return self.detector.detect(frame, scale)
+        if image is None:
+            image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        if not regions:
+            return _dlib_detect(image, self.backend, scale)
+
+        rois = [expand(region, image.shape) for region in regions]
+        roi_area = sum((bottom - top) * (right - left) for top, right, bottom, left in rois)
+        if roi_area > ROI_MAX_AREA * image.shape[0] * image.shape[1]:
+            return _dlib_detect(image, self.backend, scale)
+        locations = []
+        for top, right, bottom, left in rois:
+            crop = np.ascontiguousarray(image[top:bottom, left:right])
+            for c_top, c_right, c_bottom, c_left in face_recognition.face_locations(crop, model=self.backend):
+                locations.append((c_top + top, c_right + left, c_bottom + top, c_left + left))
+        return _merge(locations)
+
+    def detect_and_encode(self, frame, scale=1.0, timings=None, skip_boxes=()):
+        """Gate, detect and encode; returns (locations, encodings).
+
+        Encoding runs on the full-resolution RGB frame, limited to the detected
+        boxes through known_face_locations. Faces overlapping one of skip_boxes
+        (tracked faces whose identity is already known) are not encoded and get
+        None in encodings. If timings is a dict, the seconds spent in each stage
+        are stored in it.
+        """
+        started = time.perf_counter()
+        regions = self.gate_regions(frame)
+        gated = time.perf_counter()
+        if timings is not None and self.gate is not None:
+            timings['gate'] = gated - started
+        if regions is not None and not regions:
+            return [], []
+
+        image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        converted = time.perf_counter()
+        locations = self.detect(frame, image, scale, regions)
+        detected = time.perf_counter()
+        encodings = [None] * len(locations)
+        wanted = [
+            i for i, location in enumerate(locations)
+            if all(iou(location, box) < config.TRACK_IOU for box in skip_boxes)
+        ]
+        if wanted:
+            found = face_recognition.face_encodings(image, known_face_locations=[locations[i] for i in wanted])
+            for i, encoding in zip(wanted, found):
+                encodings[i] = encoding
+        if timings is not None:
+            timings['convert'] = converted - gated
+            timings['detect'] = detected - converted
+            timings['encode'] = time.perf_counter() - detected
+        return locations, encodings
+
+
+# One detector per process and configuration; cascades and networks are
+# loaded once, and worker processes build their own on first use
+_detectors = {}
+
+
+def get_detector(backend=config.DETECTION_MODEL, gate=config.DETECTION_GATE):
+    key = (backend, gate)
+    if key not in _detectors:
+        _detectors[key] = FaceDetector(backend, gate)
+    return _detectors[key]
@@ -0,0 +1,205 @@
+import copy
+import numpy as np
+
+import config
+
+# Above this many identities build_index() switches to the approximate backend
+APPROXIMATE_THRESHOLD = 50000
+
+
+def _top_k(sq_distances, k):
+    """Return (distances, indices) of the k smallest entries in each row, closest first."""
+    k = min(k, sq_distances.shape[1])
+    if k < sq_distances.shape[1]:
+        indices = np.argpartition(sq_distances, k - 1, axis=1)[:, :k]
+    else:
+        indices = np.broadcast_to(np.arange(k), sq_distances.shape).copy()
+    picked = np.take_along_axis(sq_distances, indices, axis=1)
+    order = np.argsort(picked, axis=1)
+    indices = np.take_along_axis(indices, order, axis=1)
+    picked = np.take_along_axis(picked, order, axis=1)
+    return np.sqrt(np.maximum(picked, 0.0)), indices
+
+
+class FaceIndex:
+    """Exact nearest-neighbour index over a gallery of face encodings.
+
+    The gallery is held as one contiguous float32 matrix with precomputed squared
+    norms, so a batch of probes is answered with a single matrix product:
+    |q - x|^2 = |q|^2 + |x|^2 - 2 q.x
+    """
+
+    def __init__(self, encodings, names):
+        self.matrix = np.ascontiguousarray(np.asarray(encodings, dtype=np.float32).reshape(-1, 128))
+        self.names = list(names)
+        self.norms = np.einsum('ij,ij->i', self.matrix, self.matrix)
+
+    def __len__(self):
+        return len(self.names)
+
+    def search(self, probes, k=1):
+        """Return (distances, indices), each of shape (len(probes), k), closest first."""
+        probes = np.asarray(probes, dtype=np.float32).reshape(-1, 128)
+        if len(self) == 0 or len(probes) == 0:
+            empty = np.empty((len(probes), 0))
+            return empty, empty.astype(np.intp)
+        probe_norms = np.einsum('ij,ij->i', probes, probes)
+        sq_distances = probe_norms[:, None] + self.norms[None, :] - 2.0 * (probes @ self.matrix.T)
+        return _top_k(sq_distances, k)
+
+    def match(self, probes, tolerance=0.6):
+        """Return a (name or None, distance) pair for each probe encoding."""
+        distances, indices = self.search(probes, k=1)
+        results = []
+        for row in range(len(distances)):
+            if distances.shape[1] and distances[row, 0] <= tolerance:
+                results.append((self.names[indices[row, 0]], float(distances[row, 0])))
+            else:
+                results.append((None, float(distances[row, 0]) if distances.shape[1] else None))
+        return results
+
+    def replace_identities(self, identities, encodings, names, templates=config.TEMPLATES_PER_IDENTITY):
+        """Return a copy with every row of identities dropped and the given samples added.
+
+        Only the new samples are aggregated; the rest of the gallery is copied
+        as it is. The current index stays usable until the caller swaps the
+        new one in.
+        """
+        identities = set(identities)
+        keep = np.fromiter((name not in identities for name in self.names), dtype=bool, count=len(self.names))
+        added, added_names = aggregate_templates(encodings, names, templates)
+        index = copy.copy(self)
+        index.matrix = np.concatenate([self.matrix[keep], added])
+        index.names = [name for name, kept in zip(self.names, keep) if kept] + added_names
+        index.norms = np.concatenate([self.norms[keep], np.einsum('ij,ij->i', added, added)])
+        return index
+
+
+class IVFFaceIndex(FaceIndex):
+    """Approximate index that partitions the gallery into k-means cells.
+
+    Each probe is only compared against the gallery rows in its n_probe closest
+    cells, which keeps query cost roughly constant for very large galleries at
+    the price of occasionally missing the true nearest neighbour.
+    """
+
+    def __init__(self, encodings, names, n_lists=None, n_probe=8, iterations=10, seed=0):
+        super().__init__(encodings, names)
+        if n_lists is None:
+            n_lists = max(1, int(np.sqrt(len(self))))
+        self.n_lists = min(n_lists, max(1, len(self)))
+        self.n_probe = n_probe
+        self.centroids = self._train(iterations, seed)
+        self._build_lists()
+
+    def _train(self, iterations, seed):
+        """Run k-means on (a sample of) the gallery and return the cell centroids."""
+        rng = np.random.default_rng(seed)
+        if len(self) == 0:
+            return np.empty((0, 128), dtype=np.float32)
+        sample_size = min(len(self), self.n_lists * 64)
+        sample = self.matrix[rng.choice(len(self), sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, self.n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = self._assign(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            counts = np.bincount(assignment, minlength=self.n_lists)
+            filled = counts > 0
+            centroids[filled] = sums[filled] / counts[filled, None]
+        return centroids
+
+    @staticmethod
+    def _assign(vectors, centroids):
+        """Return the index of the closest centroid for each vector."""
+        centroid_norms = np.einsum('ij,ij->i', centroids, centroids)
+        return np.argmin(centroid_norms[None, :] - 2.0 * (vectors @ centroids.T), axis=1)
+
+    def _build_lists(self):
+        """Sort gallery rows by cell so each cell is a contiguous slice."""
+        if len(self) == 0:
+            self.order = np.empty(0, dtype=np.intp)
+            self.offsets = np.zeros(1, dtype=np.intp)
+            return
+        assignment = self._assign(self.matrix, self.centroids)
+        self.order = np.argsort(assignment, kind='stable')
+        self.offsets = np.concatenate(([0], np.cumsum(np.bincount(assignment, minlength=self.n_lists))))
+        self.list_matrix = self.matrix[self.order]
+        self.list_norms = self.norms[self.order]
+
+    def replace_identities(self, identities, encodings, names, templates=config.TEMPLATES_PER_IDENTITY):
+        """Like FaceIndex.replace_identities; new rows go to the existing cells without retraining."""
+        index = super().replace_identities(identities, encodings, names, templates)
+        if len(index.centroids) == 0 and len(index):
+            index.centroids = index._train(10, 0)
+        index._build_lists()
+        return index
+
+    def search(self, probes, k=1):
+        probes = np.asarray(probes, dtype=np.float32).reshape(-1, 128)
+        if len(self) == 0 or len(probes) == 0:
+            empty = np.empty((len(probes), 0))
+            return empty, empty.astype(np.intp)
+
+        n_probe = min(self.n_probe, self.n_lists)
+        centroid_norms = np.einsum('ij,ij->i', self.centroids, self.centroids)
+        cell_scores = centroid_norms[None, :] - 2.0 * (probes @ self.centroids.T)
+        cells = np.argpartition(cell_scores, n_probe - 1, axis=1)[:, :n_probe]
+
+        distances = np.full((len(probes), k), np.inf)
+        indices = np.full((len(probes), k), -1, dtype=np.intp)
+        for row, probe in enumerate(probes):
+            candidates = np.concatenate([
+                np.arange(self.offsets[c], self.offsets[c + 1]) for c in cells[row]
+            ])
+            if candidates.size == 0:
+                continue
+            sq = self.list_norms[candidates] + probe @ probe - 2.0 * (self.list_matrix[candidates] @ probe)
+            found, local = _top_k(sq[None, :], k)
+            distances[row, :found.shape[1]] = found[0]
+            indices[row, :found.shape[1]] = self.order[candidates[local[0]]]
+        return distances, indices
+
+
+def aggregate_templates(encodings, names, per_identity=config.TEMPLATES_PER_IDENTITY):
+    """Collapse the enrollment samples of each identity into at most per_identity templates.
+
+    The first template is the centroid of the samples, which sits closer to
+    an unseen capture of the person than any single sample does. The others are
+    picked farthest-point first, so somebody enrolled with and without glasses
+    keeps a vector for each look. Returns (templates, names).
+    """
+    encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, 128)
+    names = list(names)
+    if len(set(names)) == len(names):
+        return encodings, names
+
+    groups = {}
+    for row, name in enumerate(names):
+        groups.setdefault(name, []).append(row)
+    templates, template_names = [], []
+    for name, rows in groups.items():
+        samples = encodings[rows]
+        kept = [samples.mean(axis=0)] if len(rows) > 1 else [samples[0]]
+        nearest = np.linalg.norm(samples - kept[0], axis=1)
+        while len(kept) < per_identity and nearest.max() > 1e-6:
+            farthest = int(np.argmax(nearest))
+            kept.append(samples[farthest])
+            nearest = np.minimum(nearest, np.linalg.norm(samples - samples[farthest], axis=1))
+        templates.extend(kept)
+        template_names.extend([name] * len(kept))
+    return np.asarray(templates, dtype=np.float32), template_names
+
+
+def build_index(encodings, names, approximate=None, templates=config.TEMPLATES_PER_IDENTITY):
+    """Build the right index for the gallery size, or force one with approximate=True/False.
+
+    Identities with several enrollment samples are reduced to at most
+    templates vectors first (see aggregate_templates).
+    """
+    encodings, names = aggregate_templates(encodings, names, templates)
+    if approximate is None:
+        approximate = len(names) >= APPROXIMATE_THRESHOLD
+    if approximate:
+        return IVFFaceIndex(encodings, names)
+    return FaceIndex(encodings, names)
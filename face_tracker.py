@@ -0,0 +1,137 @@
+import time
+
+import config
+from face_detection import iou
+
+
+class Track:
+    """One face followed across frames."""
+
+    __slots__ = ('id', 'box', 'name', 'candidate', 'votes', 'distance', 'last_seen', 'verified_at', 'reported')
+
+    def __init__(self, track_id, box, now):
+        self.id = track_id
+        self.box = box
+        self.name = None  # confirmed identity
+        self.candidate = None  # identity the latest encodings agree on
+        self.votes = 0
+        self.distance = None
+        self.last_seen = now
+        self.verified_at = float('-inf')
+        self.reported = False
+
+    def vote(self, name, distance, confirmations, now):
+        """Count one encoding's match; the identity changes after confirmations agreeing votes."""
+        if name == self.candidate:
+            self.votes += 1
+        else:
+            self.candidate, self.votes = name, 1
+        if self.votes >= confirmations and self.candidate != self.name:
+            self.name = self.candidate
+            self.reported = False
+        if self.name is not None and name == self.name:
+            self.verified_at = now
+            self.distance = distance
+
+
+class FaceTracker:
+    """IoU/centroid tracker that lets a known face skip the encoder.
+
+    Detection still runs on every recognized frame, but a face whose track has
+    a confirmed identity is not re-encoded until its last successful match is
+    reverify_seconds old; the track just follows the new box. A track reports
+    its identity once, when it is first confirmed, so the caller logs each
+    person once per appearance rather than once per frame.
+    """
+
+    def __init__(self, iou_threshold=config.TRACK_IOU, confirmations=config.TRACK_CONFIRMATIONS,
+                 reverify_seconds=config.TRACK_REVERIFY_SECONDS, max_age=config.TRACK_MAX_AGE_SECONDS):
+        self.iou_threshold = iou_threshold
+        self.confirmations = confirmations
+        self.reverify_seconds = reverify_seconds
+        self.max_age = max_age
+        self.tracks = []
+        self.next_id = 1
+        self.encoded = 0
+        self.skipped = 0
+
+    def skip_boxes(self, now=None):
+        """Boxes of faces that need no encoding in the next frame."""
+        now = time.monotonic() if now is None else now
+        return [
+            track.box for track in self.tracks
+            if track.name is not None and now - track.verified_at < self.reverify_seconds
+        ]
+
+    def _associate(self, locations):
+        """Pair detections with tracks: best IoU first, then nearest centre for fast movers."""
+        pairs = sorted(
+            ((iou(track.box, box), t, d) for t, track in enumerate(self.tracks) for d, box in enumerate(locations)),
+            reverse=True,
+        )
+        matched, used_tracks = {}, set()
+        for overlap, t, d in pairs:
+            if overlap < self.iou_threshold:
+                break
+            if t not in used_tracks and d not in matched:
+                matched[d] = t
+                used_tracks.add(t)
+
+        for d, box in enumerate(locations):
+            if d in matched:
+                continue
+            centre = ((box[0] + box[2]) / 2, (box[1] + box[3]) / 2)
+            best, best_distance = None, None
+            for t, track in enumerate(self.tracks):
+                if t in used_tracks:
+                    continue
+                top, right, bottom, left = track.box
+                distance = ((centre[0] - (top + bottom) / 2) ** 2 + (centre[1] - (left + right) / 2) ** 2) ** 0.5
+                # Within half a face width of where the track was
+                if distance < 0.5 * max(right - left, bottom - top) and (best is None or distance < best_distance):
+                    best, best_distance = t, distance
+            if best is not None:
+                matched[d] = best
+                used_tracks.add(best)
+        return matched
+
+    def update(self, locations, names, distances, encoded, now=None):
+        """Feed one frame's faces; returns (label per face, identities confirmed just now).
+
+        names/distances come from matching and only mean something where
+        encoded is True; the other faces were skipped because their track was
+        already known.
+        """
+        now = time.monotonic() if now is None else now
+        matched = self._associate(locations)
+
+        labels = []
+        for d, box in enumerate(locations):
+            if d in matched:
+                track = self.tracks[matched[d]]
+            else:
+                track = Track(self.next_id, box, now)
+                self.next_id += 1
+                self.tracks.append(track)
+            track.box = box
+            track.last_seen = now
+            if encoded[d]:
+                self.encoded += 1
+                track.vote(names[d], distances[d], self.confirmations, now)
+            else:
+                self.skipped += 1
+            labels.append(track.name if track.name is not None else (names[d] if encoded[d] else None))
+
+        self.tracks = [track for track in self.tracks if now - track.last_seen <= self.max_age]
+
+        confirmed = []
+        for track in self.tracks:
+            if track.name is not None and not track.reported:
+                track.reported = True
+                confirmed.append(track.name)
+        return labels, confirmed
+
+    def skip_ratio(self):
+        """Share of tracked faces that did not need the encoder so far."""
+        total = self.encoded + self.skipped
+        return self.skipped / total if total else 0.0
@@ -0,0 +1,84 @@
+import cv2
+import numpy as np
+from PyQt5.QtGui import QImage, QPainter
+from PyQt5.QtWidgets import QLabel
+
+
+class FrameRenderer:
+    """Turns BGR camera frames into preview QImages without per-frame allocations.
+
+    Each slot of a small ring owns a scaled BGR buffer, an RGB buffer and a QImage
+    that wraps the RGB buffer for its whole lifetime. A frame is first scaled
+    down to the preview size (so colour conversion and overlays touch as few
+    pixels as possible) and then converted in place with dst=. The source frame
+    is only read, so the same array can be handed to recognition untouched.
+    """
+
+    def __init__(self, ring_size=3):
+        self.ring_size = ring_size
+        self.slots = []
+        self.index = 0
+        self.size = None
+
+    def _allocate(self, width, height):
+        self.size = (width, height)
+        self.slots = []
+        for _ in range(self.ring_size):
+            scaled = np.empty((height, width, 3), dtype=np.uint8)
+            rgb = np.empty((height, width, 3), dtype=np.uint8)
+            image = QImage(rgb.data, width, height, 3 * width, QImage.Format_RGB888)
+            self.slots.append((scaled, rgb, image))
+
+    @staticmethod
+    def fit(frame_size, target_size):
+        """Return the largest (width, height) with the frame's aspect ratio that fits the target."""
+        frame_width, frame_height = frame_size
+        target_width, target_height = target_size
+        scale = min(target_width / frame_width, target_height / frame_height, 1.0)
+        return max(1, int(frame_width * scale)), max(1, int(frame_height * scale))
+
+    def render(self, frame, target_size, draw=None):
+        """Return a QImage of the frame scaled to fit target_size.
+
+        draw(rgb, scale) may paint on the scaled RGB buffer before it is shown;
+        scale maps frame coordinates to buffer coordinates. The returned QImage
+        stays valid until ring_size more frames have been rendered.
+        """
+        height, width = frame.shape[:2]
+        size = self.fit((width, height), target_size)
+        if size != self.size:
+            self._allocate(*size)
+
+        scaled, rgb, image = self.slots[self.index]
+        self.index = (self.index + 1) % self.ring_size
+        if size == (width, height):
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb)
+        else:
+            cv2.resize(frame, size, dst=scaled, interpolation=cv2.INTER_AREA)
+            cv2.cvtColor(scaled, cv2.COLOR_BGR2RGB, dst=rgb)
+        if draw is not None:
+            draw(rgb, size[0] / width)
+        return image
+
+
+class PreviewLabel(QLabel):
+    """Label that paints the latest preview QImage directly, without building a QPixmap per frame."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.image = None
+        self.setMinimumSize(320, 240)
+
+    def set_image(self, image):
+        self.image = image
+        self.update()
+
+    def paintEvent(self, event):
+        if self.image is None:
+            super().paintEvent(event)
+            return
+        painter = QPainter(self)
+        x = (self.width() - self.image.width()) // 2
+        y = (self.height() - self.image.height()) // 2
+        painter.drawImage(x, y, self.image)
+        painter.end()
@@ -0,0 +1,119 @@
+import os
+import threading
+import time
+
+import config
+import metrics
+from encoding_store import IMAGE_EXTENSIONS, identity_name
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+
+def snapshot(dataset_dir):
+    """Map every dataset image, named as EncodingStore names it, to its (mtime, size)."""
+    files = {}
+    for entry in os.scandir(dataset_dir):
+        if entry.is_dir():
+            for sample in os.scandir(entry.path):
+                if sample.name.lower().endswith(IMAGE_EXTENSIONS):
+                    stat = sample.stat()
+                    files[f"{entry.name}/{sample.name}"] = (stat.st_mtime, stat.st_size)
+        elif entry.name.lower().endswith(IMAGE_EXTENSIONS):
+            stat = entry.stat()
+            files[entry.name] = (stat.st_mtime, stat.st_size)
+    return files
+
+
+if Observer is not None:
+    class _WakeHandler(FileSystemEventHandler):
+        """Wakes the watcher thread on any change under the dataset directory."""
+
+        def __init__(self, wake):
+            super().__init__()
+            self.wake = wake
+
+        def on_any_event(self, event):
+            self.wake.set()
+
+
+class GalleryWatcher:
+    """Keeps a face index in step with the dataset directory while the app runs.
+
+    A background thread compares the dataset's mtimes every interval seconds,
+    or straight away on a file event when watchdog is installed. Changes go
+    through EncodingStore.sync(), which only encodes the new images, and only
+    the identities whose images changed are replaced in the index. The new
+    index is passed to on_update(index, added, removed) from the watcher
+    thread; swapping it in is a single assignment, so recognition never waits
+    for an update.
+    """
+
+    def __init__(self, store, index, on_update, interval=config.GALLERY_POLL_SECONDS, lock=None):
+        self.store = store
+        self.index = index
+        self.on_update = on_update
+        self.interval = interval
+        self.lock = lock if lock is not None else threading.Lock()
+        self.files = snapshot(store.dataset_dir)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self.observer = None
+        self.thread = None
+
+    def start(self):
+        if Observer is not None:
+            self.observer = Observer()
+            self.observer.schedule(_WakeHandler(self._wake), self.store.dataset_dir, recursive=True)
+            self.observer.start()
+        self.thread = threading.Thread(target=self._run, name='gallery-watch', daemon=True)
+        self.thread.start()
+        return self
+
+    def wake(self):
+        """Check for changes now instead of at the next poll."""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.check()
+            except Exception as e:
+                # A half-written image or a locked file; the next poll retries
+                print(f"Gallery update failed: {e}")
+
+    def check(self):
+        """Apply the dataset changes since the last check; returns (added, removed) identities."""
+        files = snapshot(self.store.dataset_dir)
+        if files == self.files:
+            return [], []
+        started = time.perf_counter()
+        changed = {f for f in files.keys() | self.files.keys() if files.get(f) != self.files.get(f)}
+        identities = {identity_name(f) for f in changed}
+        with self.lock:
+            encodings, names = self.store.sync()
+            rows = [row for row, name in enumerate(names) if name in identities]
+            self.index = self.index.replace_identities(identities, encodings[rows], [names[row] for row in rows])
+            index = self.index
+        self.files = files
+        added = sorted({names[row] for row in rows})
+        removed = sorted(identities - set(added))
+        metrics.observe('gallery_update', time.perf_counter() - started)
+        self.on_update(index, added, removed)
+        return added, removed
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join()
+        if self.thread is not None:
+            self.thread.join()
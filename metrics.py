@@ -0,0 +1,198 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+import numpy as np
+
+import config
+
+# Samples kept per stage for the rolling percentiles
+WINDOW = 1024
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class RollingHistogram:
+    """The last WINDOW durations of one stage, plus all-time count and sum."""
+
+    def __init__(self, window=WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def summary(self):
+        """Return {count, sum, p50, p90, p99, max} with the percentiles over the window, in seconds."""
+        summary = {'count': self.count, 'sum': self.total}
+        if self.samples:
+            window = np.fromiter(self.samples, dtype=np.float64, count=len(self.samples))
+            for q, value in zip(QUANTILES, np.quantile(window, QUANTILES)):
+                summary[f'p{int(q * 100)}'] = float(value)
+            summary['max'] = float(window.max())
+        return summary
+
+
+class Registry:
+    """Stage timings and gauges for this process.
+
+    Recording is a dict lookup and a deque append under a lock, cheap enough to
+    leave on in the frame loop. Percentiles are only computed when somebody asks
+    for a snapshot.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.gauges = {}  # (name, labels) -> value
+
+    def observe(self, stage, seconds):
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = RollingHistogram()
+            histogram.observe(seconds)
+
+    def set_gauge(self, name, value, **labels):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def span(self, stage):
+        return Span(self, stage)
+
+    def timed(self, stage):
+        """Decorator recording every call of the function as a span."""
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with Span(self, stage):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def snapshot(self):
+        """Return {'stages': {stage: summary}, 'gauges': [{name, labels, value}]}."""
+        with self.lock:
+            histograms = list(self.histograms.items())
+            gauges = list(self.gauges.items())
+        return {
+            'stages': {stage: histogram.summary() for stage, histogram in histograms},
+            'gauges': [{'name': name, 'labels': dict(labels), 'value': value} for (name, labels), value in gauges],
+        }
+
+    def to_json(self):
+        return json.dumps(dict(self.snapshot(), timestamp=time.time()), indent=2)
+
+    def to_prometheus(self, prefix='attendance'):
+        """Render the snapshot in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = [f'# TYPE {prefix}_stage_seconds summary']
+        for stage, summary in sorted(snapshot['stages'].items()):
+            for q in QUANTILES:
+                key = f'p{int(q * 100)}'
+                if key in summary:
+                    lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="{q}"}} {summary[key]:.6f}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {summary["sum"]:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {summary["count"]}')
+        typed = set()
+        for gauge in sorted(snapshot['gauges'], key=lambda g: (g['name'], sorted(g['labels'].items()))):
+            name = f"{prefix}_{gauge['name']}"
+            if name not in typed:
+                lines.append(f'# TYPE {name} gauge')
+                typed.add(name)
+            labels = ','.join(f'{key}="{value}"' for key, value in sorted(gauge['labels'].items()))
+            lines.append(f"{name}{{{labels}}} {gauge['value']}" if labels else f"{name} {gauge['value']}")
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path):
+        """Write the metrics to path, as JSON for *.json and Prometheus text otherwise."""
+        text = self.to_json() if path.endswith('.json') else self.to_prometheus()
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(text)
+        # Readers (node_exporter's textfile collector, a tail -f) never see half a file
+        os.replace(tmp_path, path)
+
+
+class Span:
+    """Context manager timing one stage; the duration is also left in .seconds."""
+
+    __slots__ = ('registry', 'stage', 'started', 'seconds')
+
+    def __init__(self, registry, stage):
+        self.registry = registry
+        self.stage = stage
+        self.seconds = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self.started
+        self.registry.observe(self.stage, self.seconds)
+        return False
+
+
+class MetricsDumper:
+    """Background thread writing the registry to a file every interval seconds."""
+
+    def __init__(self, registry, path, interval=config.METRICS_DUMP_SECONDS):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.thread = threading.Thread(target=self._run, name='metrics-dump', daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.registry.dump(self.path)
+            except OSError as e:
+                print(f"Metrics dump failed: {e}")
+
+    def stop(self):
+        """Stop the thread and write one last dump."""
+        self._stop.set()
+        self.thread.join()
+        self.registry.dump(self.path)
+
+
+# Process-wide registry used by the helpers below
+REGISTRY = Registry(enabled=config.METRICS_ENABLED)
+
+
+def span(stage):
+    """Time a block: with metrics.span('detect'): ..."""
+    return REGISTRY.span(stage)
+
+
+def timed(stage):
+    """Time every call of a function: @metrics.timed('log_attendance')"""
+    return REGISTRY.timed(stage)
+
+
+def observe(stage, seconds):
+    REGISTRY.observe(stage, seconds)
+
+
+def set_gauge(name, value, **labels):
+    REGISTRY.set_gauge(name, value, **labels)
+
+
+def start_dumper(path=config.METRICS_FILE, interval=config.METRICS_DUMP_SECONDS):
+    """Start periodic dumps of the process-wide registry; returns None if no path is configured."""
+    if not path:
+        return None
+    return MetricsDumper(REGISTRY, path, interval)
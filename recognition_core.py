@@ -0,0 +1,119 @@
+import threading
+import cv2
+import numpy as np
+
+import config
+from attendance_cache import AttendanceCache
+from attendance_store import open_store
+from encoding_store import EncodingStore
+from face_detection import get_detector
+from face_index import build_index
+from gallery_watcher import GalleryWatcher
+import metrics
+
+DATASET_DIR = 'dataset'
+ENCODINGS_DIR = 'encodings'
+
+
+def detect_and_encode(frame, model=config.DETECTION_MODEL, scale=1.0, timings=None, skip_boxes=()):
+    """Detect faces in a BGR frame and return (locations, encodings).
+
+    model picks the detection backend (see face_detection.BACKENDS); the
+    configured gate runs first and empty frames stop there. With scale < 1 the
+    main detector works on a downscaled copy, but encodings always come from the
+    full-size image. Faces overlapping skip_boxes are located but not encoded
+    (their encoding is None). If timings is a dict, the seconds spent in each
+    stage are stored in it.
+    """
+    return get_detector(model).detect_and_encode(frame, scale, timings, skip_boxes)
+
+
+def recognition_job(frame, model=config.DETECTION_MODEL, scale=1.0, skip_boxes=()):
+    """Worker-pool entry point: (locations, encodings, stage timings).
+
+    The timings travel back with the result because spans recorded inside a
+    worker process would land in that process's registry, not the caller's.
+    """
+    timings = {}
+    locations, encodings = detect_and_encode(frame, model, scale, timings, skip_boxes)
+    return locations, encodings, timings
+
+
+def observe_timings(timings):
+    """Record the stage timings returned by recognition_job."""
+    for stage, seconds in timings.items():
+        metrics.observe(stage, seconds)
+
+
+def decode_image(data):
+    """Decode JPEG/PNG bytes into a BGR frame; raises ValueError if they are not an image."""
+    frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        raise ValueError("Not a decodable image")
+    return frame
+
+
+class RecognitionCore:
+    """Encodings, face index and attendance cache, with no GUI attached.
+
+    This is everything a kiosk needs apart from the camera and the window. The
+    recognition service keeps one of these warm for all its clients; the index
+    can be rebuilt from the dataset with reload() while requests keep using the
+    previous one until the new one is swapped in. With watch=True a
+    GalleryWatcher applies dataset changes to the index as they happen.
+    """
+
+    def __init__(self, dataset_dir=DATASET_DIR, encodings_dir=ENCODINGS_DIR, attendance=None,
+                 tolerance=config.MATCH_TOLERANCE, watch=False):
+        self.encoding_store = EncodingStore(dataset_dir, encodings_dir)
+        self.attendance = attendance if attendance is not None else AttendanceCache(open_store())
+        self.tolerance = tolerance
+        self._reload_lock = threading.Lock()
+        self.watcher = None
+        self.reload()
+        if watch:
+            self.watcher = GalleryWatcher(self.encoding_store, self.face_index, self._swap_index,
+                                          lock=self._reload_lock).start()
+
+    def reload(self):
+        """Re-sync the encodings with the dataset and swap in a new index; returns its size."""
+        with self._reload_lock:
+            encodings, names = self.encoding_store.sync()
+            self.face_index = build_index(encodings, names)
+            if self.watcher is not None:
+                self.watcher.index = self.face_index
+        return len(self.face_index)
+
+    def _swap_index(self, index, added, removed):
+        self.face_index = index
+        if added or removed:
+            print(f"Gallery updated: {len(added)} added or changed, {len(removed)} removed")
+
+    def match(self, locations, encodings):
+        """Turn detector output into a list of {name, distance, location} dicts."""
+        with metrics.span('match'):
+            matches = self.face_index.match(encodings, tolerance=self.tolerance)
+        faces = []
+        for location, (name, distance) in zip(locations, matches):
+            faces.append({'name': name, 'distance': distance, 'location': [int(v) for v in location]})
+        return faces
+
+    def recognize(self, frame, scale=1.0):
+        """Detect, encode and match every face in a BGR frame in this thread."""
+        locations, encodings, timings = recognition_job(frame, config.DETECTION_MODEL, scale)
+        observe_timings(timings)
+        return self.match(locations, encodings)
+
+    def check_in(self, names, camera="", when=None):
+        """Mark attendance at when (default now) and return {name: {marked, percentage}} for each name."""
+        with metrics.span('log_attendance'):
+            marked = self.attendance.mark_present(names, when=when, camera=camera)
+        return {
+            name: {'marked': new, 'percentage': self.attendance.percentage(name)}
+            for name, new in marked.items()
+        }
+
+    def close(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+        self.attendance.close()
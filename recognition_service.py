@@ -0,0 +1,201 @@
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import config
+import metrics
+from recognition_core import RecognitionCore, decode_image, observe_timings, recognition_job
+
+# Uploads larger than this are refused before they are read
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class RecognitionService:
+    """Local HTTP/JSON front end for a warm RecognitionCore.
+
+    Runs on asyncio with a tiny HTTP/1.1 handler, so it needs nothing beyond the
+    standard library. Detection and encoding go to a worker pool; matching and
+    attendance run on the event loop, which is cheap and keeps the index and
+    the attendance cache single-threaded from the server's point of view.
+
+    Endpoints:
+      GET  /health                        gallery size and uptime
+      POST /recognize?scale=&mark=&camera= body is a JPEG/PNG image
+      POST /attendance                    {"names": [...], "camera": "...", "time": ISO 8601 (optional)}
+      GET  /attendance                    today's total
+      GET  /attendance/<name>             counters and percentage for one person
+      POST /reload                        re-sync the encodings with the dataset
+      GET  /metrics                       stage timings in Prometheus text format
+    """
+
+    def __init__(self, core, workers=config.RECOGNITION_WORKERS, executor=config.RECOGNITION_EXECUTOR):
+        self.core = core
+        self.started = time.monotonic()
+        if executor == 'thread':
+            self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='recognition')
+        else:
+            self.executor = ProcessPoolExecutor(max_workers=workers)
+
+    async def handle(self, reader, writer):
+        """Serve requests on one connection until the client closes it."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {'error': 'Upload too large'}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                try:
+                    status, payload = 200, await self.route(method, target, body)
+                except HTTPError as e:
+                    status, payload = e.status, {'error': str(e)}
+                except Exception as e:
+                    status, payload = 500, {'error': str(e)}
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep_alive=True):
+        if isinstance(payload, str):
+            # Plain text, for the Prometheus scrape endpoint
+            body, content_type = payload.encode('utf-8'), 'text/plain; version=0.0.4'
+        else:
+            body, content_type = json.dumps(payload).encode('utf-8'), 'application/json'
+        writer.write(
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + body
+        )
+        await writer.drain()
+
+    async def route(self, method, target, body):
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        path = url.path.rstrip('/') or '/'
+
+        if path == '/health' and method == 'GET':
+            return {'faces': len(self.core.face_index), 'uptime': time.monotonic() - self.started}
+        if path == '/metrics' and method == 'GET':
+            self._update_gauges()
+            return metrics.REGISTRY.to_prometheus()
+        if path == '/recognize' and method == 'POST':
+            return await self.recognize(body, query)
+        if path == '/attendance' and method == 'POST':
+            request = self._json(body)
+            try:
+                when = datetime.fromisoformat(request['time']) if request.get('time') else None
+            except (TypeError, ValueError):
+                raise HTTPError(400, "time is not an ISO 8601 timestamp")
+            return self.core.check_in(request.get('names', []), request.get('camera', ''), when)
+        if path == '/attendance' and method == 'GET':
+            return {'total_present': self.core.attendance.total_present()}
+        if path.startswith('/attendance/') and method == 'GET':
+            name = unquote(path[len('/attendance/'):])
+            return {'name': name, 'counters': self.core.attendance.counters(name),
+                    'percentage': self.core.attendance.percentage(name)}
+        if path == '/reload' and method == 'POST':
+            loop = asyncio.get_running_loop()
+            return {'faces': await loop.run_in_executor(None, self.core.reload)}
+        if path in ('/health', '/metrics', '/recognize', '/attendance', '/reload'):
+            raise HTTPError(405, f"{method} not allowed on {path}")
+        raise HTTPError(404, f"No such endpoint: {path}")
+
+    async def recognize(self, body, query):
+        """Recognize every face in an uploaded image and optionally check them in."""
+        try:
+            frame = decode_image(body)
+            scale = float(query.get('scale', 1.0))
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        locations, encodings, timings = await loop.run_in_executor(
+            self.executor, recognition_job, frame, config.DETECTION_MODEL, scale)
+        observe_timings(timings)
+        faces = self.core.match(locations, encodings)
+
+        if query.get('mark') == '1':
+            names = [face['name'] for face in faces if face['name'] is not None]
+            checked_in = self.core.check_in(names, query.get('camera', '')) if names else {}
+            for face in faces:
+                face.update(checked_in.get(face['name'], {}))
+        elapsed = time.perf_counter() - started
+        metrics.observe('recognize_request', elapsed)
+        return {'faces': faces, 'elapsed_ms': elapsed * 1000}
+
+    def _update_gauges(self):
+        metrics.set_gauge('gallery_faces', len(self.core.face_index))
+        metrics.set_gauge('uptime_seconds', round(time.monotonic() - self.started, 1))
+
+    @staticmethod
+    def _json(body):
+        try:
+            return json.loads(body or b'{}')
+        except ValueError:
+            raise HTTPError(400, "Body is not valid JSON")
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.core.close()
+
+
+async def serve(service, host=config.SERVICE_HOST, port=config.SERVICE_PORT):
+    server = await asyncio.start_server(service.handle, host, port)
+    print(f"Recognition service on http://{host}:{port} ({len(service.core.face_index)} faces)")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep the face index and attendance store warm behind a local HTTP/JSON API.")
+    parser.add_argument("--host", default=config.SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=config.SERVICE_PORT)
+    parser.add_argument("--workers", type=int, default=config.RECOGNITION_WORKERS, help="Detection/encoding workers")
+    args = parser.parse_args()
+
+    service = RecognitionService(RecognitionCore(watch=config.GALLERY_WATCH), workers=args.workers)
+    dumper = metrics.start_dumper()
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if dumper is not None:
+            dumper.stop()
+        service.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from PyQt5.QtCore import QObject, pyqtSignal
+
+import config
+import metrics
+from recognition_core import observe_timings, recognition_job
+
+# encoded[i] is False for faces the worker did not encode because they were in skip_boxes
+RecognitionResult = namedtuple('RecognitionResult',
+                               ['tag', 'locations', 'names', 'distances', 'error', 'source', 'encoded'])
+
+
+class RecognitionPipeline(QObject):
+    """Runs detection and encoding on a worker pool and reports results through a Qt signal.
+
+    Frames come from one or more sources (cameras). Each source has a single
+    waiting slot, so a newer frame replaces one that has not started yet and a
+    slow pool never builds up a backlog of stale frames. At most max_pending
+    frames are in flight; when a worker frees up the source that has waited
+    longest goes next, so a busy camera cannot starve the others.
+
+    With a service client instead of a face index, frames are sent to the
+    recognition service and matched there.
+    """
+
+    result_ready = pyqtSignal(object)
+
+    def __init__(self, face_index, workers=config.RECOGNITION_WORKERS,
+                 max_pending=config.MAX_PENDING_FRAMES, executor=config.RECOGNITION_EXECUTOR,
+                 tolerance=config.MATCH_TOLERANCE, service=None, parent=None):
+        super().__init__(parent)
+        self.face_index = face_index
+        self.service = service
+        self.tolerance = tolerance
+        self.max_pending = max_pending
+        self._pending = 0
+        self._waiting = OrderedDict()  # source -> (frame, tag, scale, skip boxes, submit time), oldest first
+        self._closed = False
+        self._lock = threading.Lock()
+        if executor == 'thread' or service is not None:
+            self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='recognition')
+        else:
+            self.executor = ProcessPoolExecutor(max_workers=workers)
+
+    @property
+    def pending(self):
+        return self._pending
+
+    @property
+    def waiting(self):
+        return len(self._waiting)
+
+    def submit(self, frame, tag=None, scale=1.0, source=None, skip_boxes=()):
+        """Queue a frame from source for recognition; returns False if it was turned away.
+
+        Faces overlapping skip_boxes are located but not encoded (see FaceTracker).
+
+        A waiting "capture" frame is never replaced by an "auto" one, and jumps
+        ahead of the other sources.
+        """
+        with self._lock:
+            if self._closed:
+                return False
+            waiting = self._waiting.get(source)
+            if waiting is not None and waiting[1] == "capture" and tag != "capture":
+                return False
+            # Replacing a waiting frame keeps the source's place in line
+            self._waiting[source] = (frame, tag, scale, skip_boxes, time.perf_counter())
+            if tag == "capture":
+                self._waiting.move_to_end(source, last=False)
+        self._dispatch()
+        return True
+
+    def _dispatch(self):
+        """Hand waiting frames to free workers, one source at a time."""
+        jobs = []
+        with self._lock:
+            while not self._closed and self._pending < self.max_pending and self._waiting:
+                jobs.append(self._waiting.popitem(last=False))
+                self._pending += 1
+            metrics.set_gauge('recognition_pending', self._pending)
+            metrics.set_gauge('recognition_waiting', len(self._waiting))
+        for source, (frame, tag, scale, skip_boxes, submitted) in jobs:
+            metrics.observe('queue_wait', time.perf_counter() - submitted)
+            try:
+                if self.service is not None:
+                    future = self.executor.submit(self.service.recognize_frame, frame, scale)
+                else:
+                    future = self.executor.submit(recognition_job, frame, config.DETECTION_MODEL, scale, skip_boxes)
+            except RuntimeError:
+                # Pool shut down between the check and the submit
+                with self._lock:
+                    self._pending -= 1
+                continue
+            future.add_done_callback(
+                lambda f, tag=tag, source=source, submitted=submitted: self._finished(f, tag, source, submitted))
+
+    def _finished(self, future, tag, source, submitted):
+        """Match the encodings from a finished job and emit the result."""
+        with self._lock:
+            self._pending -= 1
+        self._dispatch()
+        if future.cancelled():
+            return
+        try:
+            if self.service is not None:
+                faces = future.result()
+                locations = [tuple(face['location']) for face in faces]
+                names = [face['name'] for face in faces]
+                distances = [face['distance'] for face in faces]
+                encoded = [True] * len(faces)
+            else:
+                locations, encodings, timings = future.result()
+                observe_timings(timings)
+                encoded = [encoding is not None for encoding in encodings]
+                names, distances = [None] * len(encodings), [None] * len(encodings)
+                with metrics.span('match'):
+                    matches = self.face_index.match([e for e in encodings if e is not None], tolerance=self.tolerance)
+                rows = [i for i, done in enumerate(encoded) if done]
+                for i, (name, distance) in zip(rows, matches):
+                    names[i] = name
+                    distances[i] = distance
+        except Exception as e:
+            self.result_ready.emit(RecognitionResult(tag, [], [], [], str(e), source, []))
+            return
+
+        # Submit to result, including time spent waiting for a worker
+        metrics.observe('recognition_latency', time.perf_counter() - submitted)
+        self.result_ready.emit(RecognitionResult(tag, locations, names, distances, None, source, encoded))
+
+    def shutdown(self):
+        """Stop the pool without waiting for frames still being processed."""
+        with self._lock:
+            self._closed = True
+            self._waiting.clear()
+        self.executor.shutdown(wait=False, cancel_futures=True)
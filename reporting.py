@@ -0,0 +1,320 @@
+import argparse
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+import config
+import metrics
+from attendance_store import open_store
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+STUDENT_COLUMNS = ["Name", "Roll No", "Branch", "Sessions", "Days Present", "Days Absent", "Attendance Percentage"]
+BRANCH_COLUMNS = ["Branch", "Students", "Sessions", "Days Present", "Days Absent", "Attendance Percentage"]
+DAILY_COLUMNS = ["Date", "Enrolled", "Present", "Attendance Percentage"]
+WEEKLY_COLUMNS = ["Week", "Sessions", "Expected", "Present", "Attendance Percentage"]
+
+EPOCH = np.datetime64('1970-01-01', 'D')
+MIN_DAY = np.iinfo(np.int32).min
+MAX_DAY = np.iinfo(np.int32).max
+
+
+def to_days(dates):
+    """Turn 'YYYY-MM-DD' strings into int32 days since 1970; '' or None becomes MIN_DAY."""
+    # A history has millions of rows but only a few hundred distinct days: parse those once
+    codes, uniques = pd.factorize(pd.Series(dates, dtype=object))
+    parsed = pd.to_datetime(pd.Series(uniques, dtype=object), format='%Y-%m-%d', errors='coerce')
+    parsed = parsed.to_numpy(dtype='datetime64[D]')
+    days = np.full(len(parsed) + 1, MIN_DAY, dtype=np.int32)  # the last slot is for code -1 (missing)
+    valid = ~np.isnat(parsed)
+    days[:-1][valid] = (parsed[valid] - EPOCH).astype(np.int32)
+    return days[codes]
+
+
+def to_dates(days):
+    """Inverse of to_days, as 'YYYY-MM-DD' strings."""
+    return np.datetime_as_string(EPOCH + np.asarray(days, dtype=np.int64), unit='D')
+
+
+def _day(date, default):
+    return int(to_days([date])[0]) if date else default
+
+
+def _percentage(present, total):
+    """present / total * 100 rounded to two places, 0 where total is 0."""
+    present, total = np.asarray(present, dtype=np.float64), np.asarray(total, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.round(np.where(total > 0, present / total * 100, 0.0), 2)
+
+
+class ReportEngine:
+    """Attendance reports over the check-in history of a store.
+
+    Presence (one row per person and day present) is cached as two int32
+    arrays, a person code and a day number, sorted by day. A rollup of the
+    number present per day and branch is cached next to it. refresh() only
+    re-reads days from the last cached one on. A deletion changes the older
+    counts and triggers a full reload. After that a report is a couple of
+    searchsorted/bincount passes over the cache, for years of history.
+
+    Students migrated from the legacy CSV or an old database have counters that
+    sum up their history up to the migration but few dated rows behind them.
+    Their dated rows only count after the migration, and the counters from
+    before it are added to any range that covers the whole pre-migration period.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.lock = threading.RLock()
+        self.codes = {}  # name -> person code, stable across refreshes
+        self.person = np.empty(0, dtype=np.int32)
+        self.day = np.empty(0, dtype=np.int32)
+        self.sessions = np.empty(0, dtype=np.int32)
+        self.students = pd.DataFrame()
+        self.cutoff = np.empty(0, dtype=np.int32)  # per person code: last day summed in migrated counters
+        self.legacy_present = np.empty(0, dtype=np.int64)  # per person code: days present up to the cutoff
+        self.legacy_held = np.empty(0, dtype=np.int64)  # per person code: sessions up to the cutoff
+        self.rollup = pd.DataFrame(columns=["day", "branch", "present"])
+        self.watermark = None  # first day that is re-read on refresh: it may still gain check-ins
+
+    def _encode(self, names):
+        """Person codes for names, handing out new codes to names not seen before."""
+        positions, uniques = pd.factorize(pd.Series(names, dtype=object))
+        for name in uniques:
+            if name not in self.codes:
+                self.codes[name] = len(self.codes)
+        table = np.fromiter((self.codes[name] for name in uniques), dtype=np.int32, count=len(uniques))
+        return table[positions]
+
+    def refresh(self):
+        """Bring the cache up to date with the store."""
+        with self.lock, metrics.span('report_refresh'):
+            students = self.store.students_frame()
+            students["code"] = self._encode(students["name"].to_numpy())
+            students["enrolled"] = to_days(students["enrolled_date"].to_numpy())
+            students["migrated"] = to_days(students["migrated_through"].to_numpy())
+            self.students = students.set_index("code", drop=False)
+            self.sessions = np.sort(to_days(self.store.session_dates()))
+
+            start, kept = None, 0
+            if self.watermark is not None:
+                # Fewer rows before the watermark than cached means somebody was deleted
+                watermark_kept = int(np.searchsorted(self.day, self.watermark))
+                if self.store.count_presence(before=to_dates([self.watermark])[0]) == watermark_kept:
+                    start, kept = to_dates([self.watermark])[0], watermark_kept
+
+            fresh = self.store.presence_frame(start=start)
+            person = self._encode(fresh["name"].to_numpy())
+            day = to_days(fresh["date"].to_numpy())
+            self.person = np.concatenate([self.person[:kept], person])
+            self.day = np.concatenate([self.day[:kept], day])
+            # Sized after encoding the fresh rows, which may bring new names
+            self.cutoff = np.full(len(self.codes), MIN_DAY, dtype=np.int32)
+            self.cutoff[students["code"].to_numpy()] = students["migrated"].to_numpy()
+
+            # Daily rollup: only the re-read days are recounted, without migrated rows up to their cutoff
+            dated = day > self.cutoff[person]
+            branch = self.students["branch"].reindex(person[dated]).to_numpy()
+            counts = pd.DataFrame({"day": day[dated], "branch": branch}).dropna().value_counts().rename("present")
+            rollup = self.rollup[self.rollup["day"] < self.watermark] if start is not None else self.rollup.iloc[0:0]
+            self.rollup = pd.concat([rollup, counts.reset_index()], ignore_index=True)
+            if len(self.day):
+                self.watermark = int(self.day[-1])
+            self._load_legacy(students)
+        return self
+
+    def _load_legacy(self, students):
+        """Split migrated people's counters into the part up to their cutoff and the dated part after it."""
+        self.legacy_present = np.zeros(len(self.codes), dtype=np.int64)
+        self.legacy_held = np.zeros(len(self.codes), dtype=np.int64)
+        migrated = students[students["migrated"] != MIN_DAY]
+        if migrated.empty:
+            return
+        counters = self.store.all_counters()
+        totals = np.array([counters.get(name, (0, 0)) for name in migrated["name"]], dtype=np.int64).reshape(-1, 2)
+        codes = migrated["code"].to_numpy()
+        after = self.day > self.cutoff[self.person]
+        present_after = np.bincount(self.person[after], minlength=len(self.codes))[codes]
+        held_after = len(self.sessions) - np.searchsorted(self.sessions, migrated["migrated"].to_numpy(), side='right')
+        self.legacy_present[codes] = np.maximum(totals[:, 0] - present_after, 0)
+        self.legacy_held[codes] = np.maximum(totals.sum(axis=1) - held_after, 0)
+
+    def _range(self, start, end):
+        return _day(start, MIN_DAY), _day(end, MAX_DAY)
+
+    def _selected(self, branch=None, roll_no=None):
+        students = self.students
+        if branch:
+            students = students[students["branch"] == branch]
+        if roll_no:
+            students = students[students["roll_no"] == roll_no]
+        return students
+
+    def student_report(self, start=None, end=None, branch=None, roll_no=None):
+        """Sessions held, days present and absent and percentage per person over a date range."""
+        with self.lock, metrics.span('report'):
+            first, last = self._range(start, end)
+            # The cache is sorted by day, so the range is one slice
+            lo, hi = np.searchsorted(self.day, first), np.searchsorted(self.day, last, side='right')
+            person, day = self.person[lo:hi], self.day[lo:hi]
+            dated = day > self.cutoff[person]
+            present = np.bincount(person[dated], minlength=len(self.codes))
+
+            students = self._selected(branch, roll_no)
+            codes = students["code"].to_numpy()
+            cutoff = students["migrated"].to_numpy()
+            # Sessions count from the latest of the range start, the enrollment day and the day after a migration
+            since = np.maximum(np.maximum(students["enrolled"].to_numpy(), cutoff + 1), first)
+            held = np.searchsorted(self.sessions, last, side='right') - np.searchsorted(self.sessions, since)
+            held = np.maximum(held, 0)
+            days_present = present[codes]
+            # Migrated counters have no dates: only a range over the whole pre-migration period includes them
+            covers = (first <= (self.sessions[0] if len(self.sessions) else MIN_DAY)) & (last >= cutoff)
+            held = held + np.where(covers, self.legacy_held[codes], 0)
+            days_present = days_present + np.where(covers, self.legacy_present[codes], 0)
+            return pd.DataFrame({
+                "Name": students["name"].to_numpy(),
+                "Roll No": students["roll_no"].to_numpy(),
+                "Branch": students["branch"].to_numpy(),
+                "Sessions": held,
+                "Days Present": days_present,
+                "Days Absent": np.maximum(held - days_present, 0),
+                "Attendance Percentage": _percentage(days_present, held),
+            }, columns=STUDENT_COLUMNS)
+
+    def defaulters(self, start=None, end=None, branch=None, threshold=config.DEFAULTER_THRESHOLD):
+        """People below threshold percent over the range, lowest first."""
+        report = self.student_report(start, end, branch)
+        report = report[(report["Sessions"] > 0) & (report["Attendance Percentage"] < threshold)]
+        return report.sort_values(["Attendance Percentage", "Name"]).reset_index(drop=True)
+
+    def branch_report(self, start=None, end=None):
+        """Per-branch totals of the student report."""
+        report = self.student_report(start, end)
+        totals = report.groupby("Branch").agg(
+            Students=("Name", "size"), Sessions=("Sessions", "sum"),
+            **{"Days Present": ("Days Present", "sum"), "Days Absent": ("Days Absent", "sum")},
+        ).reset_index()
+        totals["Attendance Percentage"] = _percentage(totals["Days Present"], totals["Sessions"])
+        return totals[BRANCH_COLUMNS]
+
+    def daily_report(self, start=None, end=None, branch=None):
+        """Enrolled, present and percentage for each session day, from the daily rollup."""
+        with self.lock, metrics.span('report'):
+            first, last = self._range(start, end)
+            days = self.sessions[(self.sessions >= first) & (self.sessions <= last)]
+            rollup = self.rollup
+            if branch:
+                rollup = rollup[rollup["branch"] == branch]
+            present = rollup.groupby("day")["present"].sum().reindex(days, fill_value=0).to_numpy()
+            selected = self._selected(branch)
+            # Migrated people are counted from the day after their migration, like the rollup
+            enrolled_days = np.sort(np.maximum(selected["enrolled"].to_numpy(), selected["migrated"].to_numpy() + 1))
+            enrolled = np.searchsorted(enrolled_days, days, side='right')
+        return pd.DataFrame({
+            "Date": to_dates(days),
+            "Enrolled": enrolled,
+            "Present": present,
+            "Attendance Percentage": _percentage(present, enrolled),
+        }, columns=DAILY_COLUMNS)
+
+    def weekly_report(self, start=None, end=None, branch=None):
+        """The daily report summed per week, weeks starting on Monday."""
+        daily = self.daily_report(start, end, branch)
+        days = to_days(daily["Date"].to_numpy())
+        # 1970-01-01 was a Thursday
+        week = days - (days + 3) % 7
+        weekly = pd.DataFrame({"Week": week, "Sessions": 1, "Expected": daily["Enrolled"],
+                               "Present": daily["Present"]}).groupby("Week", as_index=False).sum()
+        weekly["Attendance Percentage"] = _percentage(weekly["Present"], weekly["Expected"])
+        weekly["Week"] = to_dates(weekly["Week"].to_numpy())
+        return weekly[WEEKLY_COLUMNS]
+
+    def export_events(self, path, start=None, end=None, chunk_size=config.REPORT_CHUNK_ROWS):
+        """Stream the raw check-ins to CSV or Parquet a chunk at a time; returns the rows written."""
+        with metrics.span('report_export'):
+            return write_chunks(self.store.iter_events(start, end, chunk_size), path)
+
+
+def write_chunks(chunks, path):
+    """Write DataFrame chunks to one .csv or .parquet file without holding them all; returns the rows written."""
+    rows = 0
+    tmp_path = path + '.tmp'
+    if path.endswith('.parquet'):
+        if pq is None:
+            raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+        writer = None
+        try:
+            for chunk in chunks:
+                table = pyarrow.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_path, table.schema)
+                writer.write_table(table)
+                rows += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            return 0
+    else:
+        with open(tmp_path, 'w', newline='') as f:
+            for i, chunk in enumerate(chunks):
+                chunk.to_csv(f, index=False, header=i == 0)
+                rows += len(chunk)
+    os.replace(tmp_path, path)
+    return rows
+
+
+def write_report(report, path):
+    """Write a report DataFrame as CSV, or Parquet for *.parquet."""
+    write_chunks([report], path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Attendance reports and exports over the check-in history.")
+    parser.add_argument("report", choices=["students", "defaulters", "branches", "daily", "weekly", "events"])
+    parser.add_argument("--start", help="First date, YYYY-MM-DD")
+    parser.add_argument("--end", help="Last date, YYYY-MM-DD")
+    parser.add_argument("--branch")
+    parser.add_argument("--roll-no")
+    parser.add_argument("--threshold", type=float, default=config.DEFAULTER_THRESHOLD,
+                        help="Defaulters are below this percentage")
+    parser.add_argument("--output", help="Write to a .csv or .parquet file instead of printing")
+    parser.add_argument("--backend", choices=["sqlite", "eventlog"], default=None)
+    args = parser.parse_args()
+
+    store = open_store(args.backend, migrate=False)
+    try:
+        engine = ReportEngine(store)
+        if args.report == "events":
+            if not args.output:
+                parser.error("events needs --output")
+            print(f"Exported {engine.export_events(args.output, args.start, args.end)} check-ins to {args.output}")
+            return
+        engine.refresh()
+        if args.report == "students":
+            report = engine.student_report(args.start, args.end, args.branch, args.roll_no)
+        elif args.report == "defaulters":
+            report = engine.defaulters(args.start, args.end, args.branch, args.threshold)
+        elif args.report == "branches":
+            report = engine.branch_report(args.start, args.end)
+        elif args.report == "daily":
+            report = engine.daily_report(args.start, args.end, args.branch)
+        else:
+            report = engine.weekly_report(args.start, args.end, args.branch)
+        if args.output:
+            write_report(report, args.output)
+            print(f"Wrote {len(report)} rows to {args.output}")
+        else:
+            print(report.to_string(index=False))
+    finally:
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+import json
+from urllib.error import HTTPError, URLError
+from urllib.parse import quote, urlencode
+from urllib.request import Request, urlopen
+import cv2
+
+import config
+
+
+class ServiceError(Exception):
+    pass
+
+
+class ServiceClient:
+    """Talks to a running recognition_service over HTTP.
+
+    mark_present, counters, percentage, total_present and close match
+    AttendanceCache, so the kiosk can use either one as its attendance backend.
+    """
+
+    def __init__(self, url=config.SERVICE_URL, timeout=10.0):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+
+    def _request(self, method, path, body=None, content_type='application/json'):
+        request = Request(self.url + path, data=body, method=method)
+        if body is not None:
+            request.add_header('Content-Type', content_type)
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except HTTPError as e:
+            try:
+                message = json.loads(e.read()).get('error', e.reason)
+            except ValueError:
+                message = e.reason
+            raise ServiceError(f"{e.code}: {message}")
+        except (URLError, OSError) as e:
+            raise ServiceError(f"Recognition service unavailable: {e}")
+
+    def health(self):
+        return self._request('GET', '/health')
+
+    def recognize_image(self, data, scale=1.0, mark=False, camera=""):
+        """Send JPEG/PNG bytes; returns a list of {name, distance, location[, marked, percentage]}."""
+        query = urlencode({'scale': scale, 'mark': int(mark), 'camera': camera})
+        return self._request('POST', f'/recognize?{query}', data, 'application/octet-stream')['faces']
+
+    def recognize_frame(self, frame, scale=1.0, mark=False, camera=""):
+        """JPEG-encode a BGR frame and recognize it."""
+        ok, data = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        if not ok:
+            raise ServiceError("Could not encode the frame")
+        return self.recognize_image(data.tobytes(), scale, mark, camera)
+
+    def check_in(self, names, when=None, camera=""):
+        """Check people in; returns {name: {marked, percentage}} in one round trip."""
+        request = {'names': list(names), 'camera': camera or ""}
+        if when is not None:
+            request['time'] = when.isoformat(timespec='milliseconds')
+        return self._request('POST', '/attendance', json.dumps(request).encode('utf-8'))
+
+    def mark_present(self, names, when=None, camera=""):
+        """Check people in; returns {name: first check-in today} like AttendanceCache."""
+        return {name: result['marked'] for name, result in self.check_in(names, when, camera).items()}
+
+    def counters(self, name):
+        counters = self._request('GET', f'/attendance/{quote(name, safe="")}')['counters']
+        return tuple(counters) if counters is not None else None
+
+    def percentage(self, name):
+        return self._request('GET', f'/attendance/{quote(name, safe="")}')['percentage']
+
+    def total_present(self):
+        return self._request('GET', '/attendance')['total_present']
+
+    def reload(self):
+        """Have the service pick up new or changed dataset images; returns the gallery size."""
+        return self._request('POST', '/reload', b'')['faces']
+
+    def close(self):
+        pass
@@ -0,0 +1,47 @@
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from attendance_cache import AttendanceCache
+from attendance_store import SQLiteAttendanceStore
+from file_lock import lock_file
+
+
+def write_journal(path, name):
+    with open(path, 'w', newline='') as f:
+        f.write(f"{name},{datetime(2030, 1, 7, 9).isoformat(timespec='milliseconds')},cam0\n")
+
+
+def test_only_stale_journals_are_replayed(tmp_path):
+    journal_dir = str(tmp_path)
+    # A process that is still running holds the lock on its journal
+    live = os.path.join(journal_dir, 'attendance.1.journal')
+    write_journal(live, 'ann')
+    owner = open(live + '.lock', 'a+b')
+    assert lock_file(owner)
+    # One that crashed left its journal behind, as did an older version with the shared one
+    write_journal(os.path.join(journal_dir, 'attendance.2.journal'), 'ben')
+    write_journal(os.path.join(journal_dir, 'attendance.journal'), 'cat')
+
+    store = SQLiteAttendanceStore(str(tmp_path / 'attendance.db'))
+    cache = AttendanceCache(store, journal_dir=journal_dir, flush_interval=3600)
+    try:
+        assert store.marked_on('2030-01-07') == {'ben', 'cat'}
+        assert os.path.exists(live)
+        assert sorted(os.listdir(journal_dir)) == sorted([
+            'attendance.db', 'attendance.db-shm', 'attendance.db-wal', 'journal.lock',
+            'attendance.1.journal', 'attendance.1.journal.lock',
+            os.path.basename(cache.journal_path), os.path.basename(cache.journal_path) + '.lock',
+        ])
+
+        # Check-ins made after a flush survive in this process's own journal
+        cache.mark_present(['dan'], when=datetime(2030, 1, 8, 9))
+        cache.flush()
+        cache.mark_present(['eve'], when=datetime(2030, 1, 8, 10))
+        with open(cache.journal_path) as f:
+            assert [line.split(',')[0] for line in f] == ['eve']
+    finally:
+        cache.close()
+        owner.close()
+    assert not os.path.exists(cache.journal_path)
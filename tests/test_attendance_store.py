@@ -0,0 +1,87 @@
+import os
+import sqlite3
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from attendance_store import EventLogAttendanceStore, SQLiteAttendanceStore
+
+# Schema of attendance.db before per-event history
+OLD_SCHEMA = """
+    CREATE TABLE students (
+        name TEXT PRIMARY KEY,
+        roll_no TEXT NOT NULL DEFAULT '',
+        branch TEXT NOT NULL DEFAULT '',
+        mobile_no TEXT NOT NULL DEFAULT '',
+        days_present INTEGER NOT NULL DEFAULT 0,
+        days_absent INTEGER NOT NULL DEFAULT 0,
+        absent_dates TEXT NOT NULL DEFAULT '',
+        last_date TEXT
+    );
+    CREATE TABLE attendance (
+        name TEXT NOT NULL,
+        date TEXT NOT NULL,
+        time TEXT,
+        PRIMARY KEY (name, date)
+    );
+"""
+
+
+def old_database(path):
+    """Alice was present on the 1st and 3rd and absent on the 2nd; Bob came every day."""
+    conn = sqlite3.connect(path)
+    conn.executescript(OLD_SCHEMA)
+    conn.executemany(
+        "INSERT INTO students (name, roll_no, days_present, days_absent, absent_dates, last_date) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        [("alice", "R1", 2, 1, "2030-01-02", "2030-01-03"), ("bob", "R2", 3, 0, "", "2030-01-03")],
+    )
+    conn.executemany(
+        "INSERT INTO attendance (name, date, time) VALUES (?, ?, '09:00:00')",
+        [("alice", "2030-01-01"), ("alice", "2030-01-03"),
+         ("bob", "2030-01-01"), ("bob", "2030-01-02"), ("bob", "2030-01-03")],
+    )
+    conn.commit()
+    conn.close()
+
+
+def by_name(store):
+    return {record["Name"]: record for record in store.records(absent_dates=True)}
+
+
+def test_upgraded_database_lists_only_absences_counted(tmp_path):
+    path = str(tmp_path / "attendance.db")
+    old_database(path)
+    store = SQLiteAttendanceStore(path)
+    try:
+        alice = by_name(store)["alice"]
+        assert alice["Days Absent"] == 1
+        assert alice["Absent Dates"] == "2030-01-02"
+
+        # A session after the upgrade that Alice misses is both counted and listed
+        store.mark_present(["bob"], when=datetime(2030, 1, 6, 9))
+        alice = by_name(store)["alice"]
+        assert alice["Days Absent"] == 2
+        assert alice["Absent Dates"] == "2030-01-02, 2030-01-06"
+        assert by_name(store)["bob"]["Absent Dates"] == ""
+    finally:
+        store.close()
+
+
+def test_imported_legacy_rows_list_only_absences_counted(tmp_path):
+    rows = [
+        {"name": "alice", "roll_no": "R1", "branch": "", "mobile_no": "", "last_date": "2030-01-03",
+         "days_present": 2, "days_absent": 1, "absent_dates": "2030-01-02"},
+        {"name": "bob", "roll_no": "R2", "branch": "", "mobile_no": "", "last_date": "2030-01-01",
+         "days_present": 3, "days_absent": 0, "absent_dates": ""},
+    ]
+    for store in (SQLiteAttendanceStore(str(tmp_path / "attendance.db")),
+                  EventLogAttendanceStore(str(tmp_path / "events.csv"))):
+        try:
+            store.import_legacy(rows)
+            store.mark_present(["bob"], when=datetime(2030, 1, 6, 9))
+            alice = by_name(store)["alice"]
+            assert alice["Days Absent"] == 2
+            assert alice["Absent Dates"] == "2030-01-02, 2030-01-06"
+        finally:
+            store.close()